@@ -1,17 +1,16 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog
-import random
-from collections import defaultdict
+import schleifchenturnier_ergebnis as ergebnis
+import schleifchenturnier_logik as logik
+import schleifchenturnier_metrics as metrics
 
 class SchleifchenTurnier:
     def __init__(self, root):
         self.root = root
         self.root.title("Schleifchenturnier GUI")
 
-        self.players = []
-        self.rounds_played = 0
-        self.scores = defaultdict(list)
-        self.differentials = defaultdict(list)
+        self.state = {}
+        logik.init_state(self.state)
 
         self.name_entry = tk.Text(root, height=10, width=30)
         self.name_entry.pack(pady=10)
@@ -42,115 +41,68 @@ class SchleifchenTurnier:
 
     def add_player(self):
         new_player = simpledialog.askstring("Spieler hinzufügen", "Name des Spielers:")
-        if new_player and new_player not in self.players:
-            self.players.append(new_player)
-            self.scores[new_player] = ['X'] * self.rounds_played
-            self.differentials[new_player] = ['X'] * self.rounds_played
+        if new_player and new_player.strip() and logik.add_player(self.state, new_player) is not None:
             self.render_tables()
 
     def remove_player(self):
         remove_player = simpledialog.askstring("Spieler entfernen", "Name des Spielers:")
-        if remove_player in self.players:
-            self.players.remove(remove_player)
-            del self.scores[remove_player]
-            del self.differentials[remove_player]
+        pid = logik.player_id(self.state, remove_player) if remove_player else None
+        if pid in self.state['players']:
+            logik.remove_player(self.state, pid)
             self.render_tables()
 
+    @metrics.timed("tk.next_round")
     def next_round(self):
-        if not self.players:
-            self.players = [name.strip() for name in self.name_entry.get("1.0", tk.END).split("\n") if name.strip()]
-            for player in self.players:
-                self.scores[player] = []
-                self.differentials[player] = []
-
-        if len(self.players) < 4:
+        if not self.state['players']:
+            names = [name.strip() for name in self.name_entry.get("1.0", tk.END).split("\n") if name.strip()]
+            logik.load_players(self.state, names)
+        if len(logik.active_players(self.state)) < 4:
             messagebox.showwarning("Nicht genug Spieler", "Mindestens 4 Spieler werden benötigt.")
             return
 
         for widget in self.matches_frame.winfo_children():
             widget.destroy()
 
-        players_with_games = sorted(self.players, key=lambda p: sum(1 for x in self.scores[p] if x != 'X'))
-        games_dict = defaultdict(list)
-        for p in players_with_games:
-            games_played = sum(1 for x in self.scores[p] if x != 'X')
-            games_dict[games_played].append(p)
-
-        grouped_sorted_players = []
-        for game_count in sorted(games_dict.keys()):
-            group = games_dict[game_count]
-            random.shuffle(group)
-            grouped_sorted_players.extend(group)
-
-        temp_players = grouped_sorted_players[:]
-        self.current_matches = []
-
-        while len(temp_players) >= 4:
-            team1 = [temp_players.pop(0), temp_players.pop(0)]
-            team2 = [temp_players.pop(0), temp_players.pop(0)]
-            self.current_matches.append((team1, team2))
-
-        self.bye_players = temp_players
+        logik.draw_round(self.state, candidates=20)
+        self.current_matches = self.state['matches']
+        self.bye_players = self.state['byes']
 
         self.match_vars = []
         for i, match in enumerate(self.current_matches):
             team1, team2 = match
             var = tk.StringVar()
-            lbl = tk.Label(self.matches_frame, text=f"Match {i+1}: {team1[0]} & {team1[1]} vs {team2[0]} & {team2[1]}")
+            lbl = tk.Label(self.matches_frame, text=f"Match {i+1}: {logik.format_match(self.state, team1, team2)}")
             lbl.pack(anchor="w")
             entry = tk.Entry(self.matches_frame, textvariable=var, width=8)
             entry.pack(anchor="w", padx=10)
             self.match_vars.append((team1, team2, var))
 
         for p in self.bye_players:
-            lbl = tk.Label(self.matches_frame, text=f"{p} hat spielfrei")
+            lbl = tk.Label(self.matches_frame, text=f"{logik.name_of(self.state, p)} hat spielfrei")
             lbl.pack()
 
+    @metrics.timed("tk.submit_results")
     def submit_results(self):
-        self.rounds_played += 1
-        round_results = {}
-        for team1, team2, var in self.match_vars:
-            try:
-                result = var.get().strip()
-                score1, score2 = map(int, result.split(":"))
-            except:
-                messagebox.showerror("Fehler", f"Ungültiges Ergebnis für Match: {team1} vs {team2}")
-                return
-
-            if score1 > score2:
-                for player in team1:
-                    round_results[player] = (score1 - score2, 1)
-                for player in team2:
-                    round_results[player] = (score2 - score1, 0)
-            else:
-                for player in team1:
-                    round_results[player] = (score1 - score2, 0)
-                for player in team2:
-                    round_results[player] = (score2 - score1, 1)
-
-        for player in self.players:
-            if player in round_results:
-                diff, points = round_results[player]
-                self.scores[player].append(points)
-                self.differentials[player].append(diff)
-            else:
-                self.scores[player].append('X')
-                self.differentials[player].append('X')
+        results, errors = ergebnis.parse_results([var.get() for _, _, var in self.match_vars], self.state['format'])
+        errors += [(i, "Ergebnis fehlt") for i, result in enumerate(results) if result is None and i not in dict(errors)]
+        if errors:
+            lines = [
+                f"{logik.format_match(self.state, self.match_vars[i][0], self.match_vars[i][1])}: {message}"
+                for i, message in sorted(errors)
+            ]
+            messagebox.showerror("Fehler", "Ungültige Ergebnisse:\n" + "\n".join(lines))
+            return
 
+        logik.record_round(self.state, results)
         self.render_tables()
 
+    @metrics.timed("tk.render_tables")
     def render_tables(self):
         for widget in self.tables_frame.winfo_children():
             widget.destroy()
 
-        def sort_by_total(data):
-            return sorted(
-                data.items(),
-                key=lambda item: (
-                    -sum(v for v in item[1] if v != 'X'),
-                    -sum(self.differentials[item[0]][i] if self.differentials[item[0]][i] != 'X' else 0 for i in range(len(item[1])))
-                )
-            )
+        names = self.state['names']
+        ranking = logik.sorted_ranking(self.state)
 
         def create_table(frame, data, title):
             table_frame = tk.Frame(frame)
@@ -160,16 +112,18 @@ class SchleifchenTurnier:
             tk.Label(table_frame, text="Spieler").grid(row=1, column=1)
             tk.Label(table_frame, text="Spiele").grid(row=1, column=2)
 
-            max_rounds = max(len(r) for r in data.values())
+            max_rounds = self.state['round']
             for r in range(max_rounds):
                 tk.Label(table_frame, text=f"R{r+1}").grid(row=1, column=3 + r)
 
             tk.Label(table_frame, text="Summe").grid(row=1, column=3 + max_rounds)
 
-            sorted_data = sort_by_total(data)
-            for i, (player, results) in enumerate(sorted_data):
+            for i, player in enumerate(ranking):
+                results = data[player]
                 tk.Label(table_frame, text=str(i+1)).grid(row=2+i, column=0)
-                tk.Label(table_frame, text=player).grid(row=2+i, column=1)
+                status = self.state['status'][player]
+                label = names[player] if status == logik.ACTIVE else f"{names[player]} ({status})"
+                tk.Label(table_frame, text=label).grid(row=2+i, column=1)
                 games_played = sum(1 for x in results if x != 'X')
                 tk.Label(table_frame, text=str(games_played)).grid(row=2+i, column=2)
                 total = 0
@@ -182,15 +136,12 @@ class SchleifchenTurnier:
                 if i == 7:
                     tk.Frame(table_frame, height=2, bd=1, relief="sunken").grid(row=3+i, column=0, columnspan=25, sticky="we")
 
-        create_table(self.tables_frame, self.scores, "Schleifchen-Tabelle")
-        create_table(self.tables_frame, self.differentials, "Differenz-Tabelle")
+        create_table(self.tables_frame, self.state['scores'], "Schleifchen-Tabelle")
+        create_table(self.tables_frame, self.state['differentials'], "Differenz-Tabelle")
 
     def show_semifinals(self):
-        ranking = sorted(self.players, key=lambda p: (
-            -sum(v for v in self.scores[p] if v != 'X'),
-            -sum(d for d in self.differentials[p] if d != 'X')
-        ))
-        top8 = ranking[:8]
+        names = self.state['names']
+        top8 = [names[p] for p in logik.sorted_ranking(self.state, (logik.ACTIVE, logik.PAUSED))[:8]]
         if len(top8) < 8:
             messagebox.showinfo("Halbfinale", "Weniger als 8 Spieler im Ranking – Halbfinale kann nicht gebildet werden.")
             return
@@ -203,3 +154,5 @@ if __name__ == "__main__":
     root = tk.Tk()
     app = SchleifchenTurnier(root)
     root.mainloop()
+    if metrics.PROMETHEUS_FILE:
+        metrics.REGISTRY.write_prometheus(metrics.PROMETHEUS_FILE)
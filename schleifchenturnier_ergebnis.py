@@ -0,0 +1,214 @@
+"""Ergebnisse lesen und prüfen, abhängig vom Spielformat.
+
+Eingaben wie "4:2", "4-2", "4 : 2", "4:3 (5:3)" oder bei mehreren Sätzen
+"4:2 3:4 [10:8]" werden zu ``(score1, score2)`` für die Tabellen. Bei einem
+Satz sind das die Spiele, bei Best-of-N die gewonnenen Sätze, beim reinen
+Punkteformat die Punkte – die Differenz ist also immer Gewinner minus
+Verlierer in derselben Einheit und der Sieger hat den höheren Wert.
+
+Die gültigen Satzergebnisse je Format werden beim Import einmal berechnet;
+der häufigste Fall (ein Satz, "a:b") kostet damit einen Regex-Match und einen
+Set-Lookup.
+"""
+import re
+
+DEFAULT_FORMAT = "fast4"
+
+# saetze: Best-of-N; spiele: Spiele zum Satzgewinn; tiebreak_bei: Spielstand
+# (je Team), bei dem der Tiebreak gespielt wird; tiebreak_punkte/-vorsprung:
+# Punkte zum Tiebreak-Gewinn und nötiger Vorsprung (1 = Sudden Death).
+FORMATS = {
+    "fast4": {
+        "name": "Fast4 (1 Satz bis 4)", "art": "saetze", "beispiel": "4:2",
+        "saetze": 1, "spiele": 4, "tiebreak_bei": 3, "tiebreak_punkte": 5, "tiebreak_vorsprung": 1,
+    },
+    "fast4_bo3": {
+        "name": "Fast4, 2 Gewinnsätze", "art": "saetze", "beispiel": "4:2 3:4 4:1",
+        "saetze": 3, "spiele": 4, "tiebreak_bei": 3, "tiebreak_punkte": 5, "tiebreak_vorsprung": 1,
+    },
+    "satz": {
+        "name": "1 Satz bis 6 (Tiebreak bei 6:6)", "art": "saetze", "beispiel": "6:4",
+        "saetze": 1, "spiele": 6, "tiebreak_bei": 6, "tiebreak_punkte": 7, "tiebreak_vorsprung": 2,
+    },
+    "bo3_mtb": {
+        "name": "2 Gewinnsätze, Match-Tiebreak bis 10", "art": "saetze", "beispiel": "6:4 3:6 [10:8]",
+        "saetze": 3, "spiele": 6, "tiebreak_bei": 6, "tiebreak_punkte": 7, "tiebreak_vorsprung": 2,
+        "match_tiebreak": 10,
+    },
+    "punkte": {
+        "name": "Nur Punkte", "art": "punkte", "beispiel": "21:15",
+    },
+    "punkte_remis": {
+        "name": "Nur Punkte, Unentschieden möglich", "art": "punkte", "beispiel": "3:3", "unentschieden": True,
+    },
+}
+
+_SEP = r"\s*[:\-–]\s*"
+_SIMPLE = re.compile(rf"\s*(\d{{1,3}}){_SEP}(\d{{1,3}})\s*")
+_SET = re.compile(
+    rf"(\[)?\s*(\d{{1,3}}){_SEP}(\d{{1,3}})(?(1)\s*\])"
+    rf"(?:\s*\(\s*(\d{{1,2}})(?:{_SEP}(\d{{1,2}}))?\s*\))?"
+)
+_BETWEEN_SETS = re.compile(r"\s*[,;/]?\s*")
+
+
+def _set_scores(spec):
+    """Alle gültigen Satzergebnisse (Sieger, Verlierer) und das Tiebreak-Ergebnis."""
+    games, tb = spec["spiele"], spec["tiebreak_bei"]
+    scores = {(games, loser) for loser in range(games - 1)}
+    if tb == games:
+        scores.add((games + 1, games - 1))
+    scores.add((tb + 1, tb))
+    return frozenset(scores), (tb + 1, tb)
+
+
+def _compile(spec):
+    rules = dict(spec)
+    if spec["art"] == "saetze":
+        rules["satzergebnisse"], rules["tiebreak_satz"] = _set_scores(spec)
+        rules["noetig"] = spec["saetze"] // 2 + 1
+    return rules
+
+
+_RULES = {key: _compile(spec) for key, spec in FORMATS.items()}
+
+
+def format_name(fmt):
+    return FORMATS[fmt]["name"]
+
+
+def _tiebreak_ok(winner, loser, points, lead):
+    if lead == 1:
+        return winner == points and loser < points
+    return winner >= points and winner - loser >= 2 and (winner == points or winner - loser == 2)
+
+
+def _check_set(rules, a, b, tb_points):
+    if a == b:
+        raise ValueError(f"{a}:{b} ist kein Satzergebnis")
+    winner, loser = max(a, b), min(a, b)
+    if (winner, loser) not in rules["satzergebnisse"]:
+        raise ValueError(f"{a}:{b} ist im Format {rules['name']} kein gültiger Satz")
+    if tb_points is not None:
+        if (winner, loser) != rules["tiebreak_satz"]:
+            raise ValueError(f"{a}:{b} wurde nicht im Tiebreak entschieden")
+        tb_a, tb_b = tb_points
+        if tb_b is None:
+            # Kurzschreibweise "7:6 (5)": nur die Punkte des Verlierers
+            tb_loser = tb_a
+            tb_winner = max(rules["tiebreak_punkte"], tb_loser + rules["tiebreak_vorsprung"])
+        else:
+            if (tb_a > tb_b) != (a > b):
+                raise ValueError(f"Tiebreak ({tb_a}:{tb_b}) passt nicht zum Satz {a}:{b}")
+            tb_winner, tb_loser = max(tb_a, tb_b), min(tb_a, tb_b)
+        if not _tiebreak_ok(tb_winner, tb_loser, rules["tiebreak_punkte"], rules["tiebreak_vorsprung"]):
+            raise ValueError(f"Tiebreak ({tb_winner}:{tb_loser}) ist nicht möglich")
+
+
+def _parse_sets(text):
+    """Zerlegt die Eingabe in Sätze ``(a, b, tiebreak, in_klammern)``."""
+    sets = []
+    pos, end = 0, len(text)
+    while True:
+        m = _SET.match(text, pos)
+        if not m:
+            raise ValueError(f"'{text.strip()}' ist nicht lesbar")
+        bracket, a, b, tb1, tb2 = m.groups()
+        tb = None if tb1 is None else (int(tb1), None if tb2 is None else int(tb2))
+        sets.append((int(a), int(b), tb, bracket is not None))
+        pos = m.end()
+        if text[pos:].strip() == "":
+            return sets
+        sep = _BETWEEN_SETS.match(text, pos)
+        if sep.end() == pos:
+            raise ValueError(f"'{text.strip()}' ist nicht lesbar")
+        pos = sep.end()
+        if pos >= end:
+            return sets
+
+
+def _check_match(rules, sets):
+    need, won = rules["noetig"], [0, 0]
+    for i, (a, b, tb, bracket) in enumerate(sets):
+        if max(won) == need:
+            raise ValueError(f"Das Match war nach {i} Sätzen schon entschieden")
+        deciding = won == [need - 1, need - 1]
+        if bracket and not (deciding and rules.get("match_tiebreak")):
+            raise ValueError("[..] ist nur für den Match-Tiebreak im Entscheidungssatz vorgesehen")
+        if deciding and rules.get("match_tiebreak"):
+            if a == b or not _tiebreak_ok(max(a, b), min(a, b), rules["match_tiebreak"], 2):
+                raise ValueError(f"{a}:{b} ist kein gültiger Match-Tiebreak")
+        else:
+            _check_set(rules, a, b, tb)
+        won[0 if a > b else 1] += 1
+    if max(won) < need:
+        raise ValueError(f"Unvollständig: {won[0]}:{won[1]} Sätze, nötig sind {need}")
+    return won[0], won[1]
+
+
+def _check_points(rules, a, b):
+    if a == b and not rules.get("unentschieden"):
+        raise ValueError(f"{a}:{b} – unentschieden ist nicht vorgesehen")
+    target = rules.get("ziel")
+    if target and max(a, b) < target:
+        raise ValueError(f"{a}:{b} – gespielt wird bis {target}")
+    return a, b
+
+
+def parse_result(text, fmt=DEFAULT_FORMAT):
+    """Liest ein Ergebnis; leere Eingabe bedeutet nicht gespielt (``None``).
+
+    Bei ungültiger Eingabe gibt es einen ``ValueError`` mit lesbarer Begründung.
+    """
+    rules = _RULES[fmt]
+    if not text or text.isspace():
+        return None
+    m = _SIMPLE.fullmatch(text)
+    if m:
+        a, b = int(m.group(1)), int(m.group(2))
+        if rules["art"] == "punkte":
+            return _check_points(rules, a, b)
+        if rules["saetze"] == 1:
+            _check_set(rules, a, b, None)
+            return a, b
+        return _check_match(rules, [(a, b, None, False)])
+    if rules["art"] == "punkte":
+        raise ValueError(f"'{text.strip()}' ist nicht lesbar (erwartet z.B. {rules['beispiel']})")
+    sets = _parse_sets(text)
+    if rules["saetze"] == 1:
+        if len(sets) != 1:
+            raise ValueError(f"Im Format {rules['name']} wird nur ein Satz gespielt")
+        a, b, tb, bracket = sets[0]
+        if bracket:
+            raise ValueError("[..] ist nur für den Match-Tiebreak vorgesehen")
+        _check_set(rules, a, b, tb)
+        return a, b
+    return _check_match(rules, sets)
+
+
+def parse_results(texts, fmt=DEFAULT_FORMAT):
+    """Liest viele Ergebnisse auf einmal.
+
+    Liefert ``(ergebnisse, fehler)``; ``fehler`` enthält ``(index, meldung)``
+    für jede ungültige Eingabe, deren Ergebnis dann ``None`` ist.
+    """
+    results, errors = [], []
+    for i, text in enumerate(texts):
+        try:
+            results.append(parse_result(text, fmt))
+        except ValueError as e:
+            results.append(None)
+            errors.append((i, str(e)))
+    return results, errors
+
+
+def valid_score(fmt, score1, score2):
+    """Prüft ein bereits umgerechnetes Tabellenergebnis (z.B. von der Offline-Eingabe)."""
+    rules = _RULES[fmt]
+    if score1 < 0 or score2 < 0:
+        return False
+    if rules["art"] == "punkte":
+        return score1 != score2 or bool(rules.get("unentschieden"))
+    if rules["saetze"] == 1:
+        return (max(score1, score2), min(score1, score2)) in rules["satzergebnisse"]
+    return max(score1, score2) == rules["noetig"] and min(score1, score2) < rules["noetig"]
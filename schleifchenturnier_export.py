@@ -0,0 +1,224 @@
+"""Export von Rangliste, Runden und Matches als CSV, Parquet und PDF.
+
+Alle Tabellen werden als Generatoren Zeile für Zeile erzeugt und direkt in
+die Zieldatei geschrieben; ein Turnier wird dabei nie ein zweites Mal im
+Speicher aufgebaut. Mehrere gespeicherte Sessions lassen sich als Archiv
+exportieren, dann ist immer nur eine davon geladen:
+
+    python schleifchenturnier_export.py matches saison/*.pkl -o matches.parquet
+"""
+import argparse
+import csv
+import os
+import pickle
+import sys
+
+import schleifchenturnier_logik as logik
+
+# Spalten je Tabelle: (Name, Typ) mit Typ "int", "num" (je nach Wertung auch Brüche) oder "str"
+TABLES = {
+    "rangliste": [
+        ("platz", "int"), ("spieler", "str"), ("status", "str"),
+        ("spiele", "int"), ("schleifchen", "num"), ("differenz", "int"),
+    ],
+    "runden": [
+        ("runde", "int"), ("spieler", "str"), ("schleifchen", "num"), ("differenz", "int"),
+    ],
+    "matches": [
+        ("runde", "int"), ("match", "int"), ("a1", "str"), ("a2", "str"), ("b1", "str"), ("b2", "str"),
+        ("spiele_a", "int"), ("spiele_b", "int"),
+    ],
+}
+TOURNAMENT_COLUMN = ("turnier", "str")
+PARQUET_BATCH_ROWS = 4096
+
+
+def standings_rows(state):
+    names, status, totals = state['names'], state['status'], state['totals']
+    for place, pid in enumerate(logik.sorted_ranking(state), start=1):
+        yield (place, names[pid], status[pid], totals[pid][2], totals[pid][0], totals[pid][1])
+
+
+def round_rows(state):
+    names = state['names']
+    for rnd in range(state['round']):
+        for pid in state['players']:
+            point = state['scores'][pid][rnd]
+            diff = state['differentials'][pid][rnd]
+            if point == 'X':
+                point = diff = None
+            yield (rnd + 1, names[pid], point, diff)
+
+
+def match_rows(state):
+    for rnd, round_log in enumerate(state['result_log'], start=1):
+        for m, (t1, t2, score1, score2) in enumerate(round_log, start=1):
+            yield (rnd, m, *(logik.name_of(state, p) for p in t1 + t2), score1, score2)
+
+
+ROWS = {"rangliste": standings_rows, "runden": round_rows, "matches": match_rows}
+
+
+def table_rows(state, table):
+    return ROWS[table](state)
+
+
+def load_session(path):
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    logik.ensure_state(state)
+    return state
+
+
+def archive_rows(paths, table):
+    """Zeilen einer Tabelle über mehrere gespeicherte Sessions, mit Turniername vorne."""
+    for path in paths:
+        tournament = os.path.splitext(os.path.basename(path))[0]
+        for row in table_rows(load_session(path), table):
+            yield (tournament, *row)
+
+
+# Schreiber
+
+def write_csv(columns, rows, fh):
+    """Schreibt Zeilen als CSV in eine Textdatei; ``None`` wird zu einem leeren Feld."""
+    writer = csv.writer(fh)
+    writer.writerow([name for name, _ in columns])
+    for row in rows:
+        writer.writerow(row)
+
+
+def write_parquet(columns, rows, where, batch_rows=PARQUET_BATCH_ROWS):
+    """Schreibt Zeilen spaltenweise als Parquet, jeweils ``batch_rows`` pro Row-Group."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Für den Parquet-Export wird 'pyarrow' benötigt (pip install pyarrow)") from e
+
+    types = {"int": pa.int64(), "num": pa.float64(), "str": pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    with pq.ParquetWriter(where, schema) as writer:
+        batch = [[] for _ in columns]
+        for row in rows:
+            for col, value in zip(batch, row):
+                col.append(value)
+            if len(batch[0]) >= batch_rows:
+                writer.write_batch(pa.record_batch(batch, schema=schema))
+                batch = [[] for _ in columns]
+        if batch[0]:
+            writer.write_batch(pa.record_batch(batch, schema=schema))
+
+
+def export_table(state, table, fmt, fh):
+    """Exportiert eine Tabelle einer Session in ``fh`` (CSV: Text, sonst binär)."""
+    if fmt == "csv":
+        write_csv(TABLES[table], table_rows(state, table), fh)
+    elif fmt == "parquet":
+        write_parquet(TABLES[table], table_rows(state, table), fh)
+    elif fmt == "pdf" and table == "rangliste":
+        write_standings_pdf(state, fh)
+    else:
+        raise ValueError(f"Export von '{table}' als {fmt} wird nicht unterstützt")
+
+
+# Druckbare Rangliste als PDF (A4, Helvetica), seitenweise geschrieben
+
+PDF_ROWS_PER_PAGE = 40
+PDF_COLUMNS = [("Platz", 50), ("Spieler", 90), ("Status", 300), ("Spiele", 380), ("Siege", 440), ("Differenz", 500)]
+
+
+def _pdf_text(text):
+    raw = str(text).encode("cp1252", errors="replace").decode("latin-1")
+    return raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pdf_page(title, page_rows, page_no):
+    lines = ["BT", "/F1 16 Tf", f"50 800 Td ({_pdf_text(title)}) Tj", "ET", "/F1 10 Tf"]
+    y = 770
+    for text, x in PDF_COLUMNS:
+        lines.append(f"BT {x} {y} Td ({_pdf_text(text)}) Tj ET")
+    lines.append(f"50 {y - 4} m 545 {y - 4} l S")
+    for row in page_rows:
+        y -= 18
+        for value, (_, x) in zip(row, PDF_COLUMNS):
+            lines.append(f"BT {x} {y} Td ({_pdf_text(value)}) Tj ET")
+        if row[0] == 8:
+            lines.append(f"50 {y - 5} m 545 {y - 5} l S")
+    lines.append(f"BT 50 30 Td (Seite {page_no}) Tj ET")
+    return "\n".join(lines).encode("latin-1")
+
+
+def write_standings_pdf(state, fh, title=None):
+    """Schreibt die Rangliste als druckbares PDF in eine Binärdatei."""
+    title = title or f"Rangliste nach Runde {state['round']}"
+    offsets = {}
+    written = 0
+
+    def emit(data):
+        nonlocal written
+        fh.write(data)
+        written += len(data)
+
+    def emit_object(num, body):
+        offsets[num] = written
+        emit(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    emit_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    emit_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    next_id = 4
+    page_rows = []
+
+    def flush_page():
+        nonlocal next_id, page_rows
+        content = _pdf_page(title, page_rows, len(page_ids) + 1)
+        emit_object(next_id, f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+        emit_object(
+            next_id + 1,
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {next_id} 0 R >>".encode()
+        )
+        page_ids.append(next_id + 1)
+        next_id += 2
+        page_rows = []
+
+    for place, name, status, games, points, diff in standings_rows(state):
+        page_rows.append((place, name, status, games, points, diff))
+        if len(page_rows) == PDF_ROWS_PER_PAGE:
+            flush_page()
+    if page_rows or not page_ids:
+        flush_page()
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    emit_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+
+    xref_offset = written
+    emit(f"xref\n0 {next_id}\n0000000000 65535 f \n".encode())
+    for num in range(1, next_id):
+        emit(f"{offsets[num]:010d} 00000 n \n".encode())
+    emit(f"trailer\n<< /Size {next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportiert gespeicherte Schleifchenturnier-Sessions.")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("sessions", nargs="+", help="Session-Dateien (.pkl)")
+    parser.add_argument("-o", "--output", help="Zieldatei (.csv oder .parquet); ohne Angabe CSV auf stdout")
+    args = parser.parse_args(argv)
+
+    columns = [TOURNAMENT_COLUMN] + TABLES[args.table]
+    rows = archive_rows(args.sessions, args.table)
+    if args.output and args.output.endswith(".parquet"):
+        write_parquet(columns, rows, args.output)
+    elif args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as fh:
+            write_csv(columns, rows, fh)
+    else:
+        write_csv(columns, rows, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
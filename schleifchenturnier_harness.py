@@ -0,0 +1,384 @@
+"""Headless-Prüfstand für die Webapp.
+
+Spielt mit Streamlits AppTest komplette Turniere durch die Oberfläche –
+Liste laden, pausieren, nachmelden, auslosen, tauschen, Ergebnisse (auch
+ungültige) eintragen, korrigieren, speichern und laden – und prüft nach jeder
+Runde:
+
+- jeder Spieler steht höchstens einmal in einer Runde, ausgelost werden nur
+  aktive Spieler,
+- Freilose sind unter den durchgehend aktiven Spielern gleich verteilt
+  (höchstens eins Unterschied),
+- Tabellen und Summen stimmen mit der History überein (Neuberechnung über
+  ``schleifchenturnier_wertung.rescore``),
+- Speichern und Laden einer Session ändert nichts – auch mit offenem
+  Bearbeiten-Modus und beim Hochladen der Datei,
+- Änderungen im Paarungs-Editor kommen an, und alle Downloads (Export,
+  Prometheus) lassen sich erzeugen.
+
+Dazu wird die Skriptlaufzeit jedes Durchlaufs (laut
+``schleifchenturnier_metrics``) je Spielerzahl und Runde festgehalten.
+
+    python schleifchenturnier_harness.py --spieler 8 16 32 --runden 8
+    python schleifchenturnier_harness.py --max-rerun-ms 150 --startzeit
+    python schleifchenturnier_harness.py --spieler 16 --turnier-seed 123456   # ein Turnier nachspielen
+
+Exit-Code 1 bei verletzten Invarianten oder überschrittenem Budget.
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import tempfile
+
+import schleifchenturnier_logik as logik
+import schleifchenturnier_metrics as metrics
+import schleifchenturnier_wertung as wertung
+
+WEBAPP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schleifchenturnier_webapp.py")
+
+# Was beim Speichern und Laden unverändert bleiben muss, abgeleitete Daten eingeschlossen
+ROUNDTRIP_KEYS = (
+    "names", "players", "status", "aliases", "scores", "differentials", "totals", "result_log", "round",
+    "matches", "byes", "team_counts", "amendments", "seed", "draw_log", "format", "scoring", "bye_log",
+    "pairing_issues", "slots", "pending_results", "version",
+)
+SESSION_FILE = "session_backup.pkl"
+FAST4_RESULTS = [f"4:{loser}" for loser in range(4)] + [f"{loser}:4" for loser in range(4)]
+SLOT_COLUMNS = ["A1", "A2", "B1", "B2"]
+# Download-Button -> Anfang einer gültigen Datei
+EXPORT_DOWNLOADS = {"⬇️ CSV": None, "⬇️ Parquet": b"PAR1"}
+EXTRA_DOWNLOADS = {"🖨️ Rangliste (PDF)": b"%PDF", "⬇️ Prometheus": b"# HELP"}
+
+
+def _track_media_file_manager():
+    """AppTest legt je Durchlauf einen eigenen MediaFileManager an und vergisst ihn
+    danach wieder; für die Downloads merken wir uns den zuletzt benutzten."""
+    from streamlit.runtime.media_file_manager import MediaFileManager
+
+    original = MediaFileManager.add_deferred
+    if getattr(original, "tracked", False):
+        return
+
+    def add_deferred(self, *args, **kwargs):
+        App.media_files = self
+        return original(self, *args, **kwargs)
+
+    add_deferred.tracked = True
+    MediaFileManager.add_deferred = add_deferred
+
+
+class App:
+    """Eine Browser-Session der Webapp; merkt sich die Skriptlaufzeit jedes Durchlaufs."""
+
+    media_files = None
+
+    def __init__(self, timeout=60):
+        from streamlit.testing.v1 import AppTest
+
+        _track_media_file_manager()
+        self.at = AppTest.from_file(WEBAPP, default_timeout=timeout)
+        self.timings = []
+        self.run()
+
+    def run(self):
+        self.at.run()
+        if self.at.exception:
+            raise RuntimeError(f"Exception in der Webapp: {self.at.exception[0].value}")
+        self.timings.append(metrics.REGISTRY.last("rerun"))
+
+    def click(self, label):
+        for button in self.at.button:
+            if button.label.startswith(label):
+                button.click()
+                return self.run()
+        raise KeyError(f"Button '{label}' nicht gefunden")
+
+    def download(self, label):
+        """Erzeugt eine Datei wie der Server beim Klick auf den Download-Button."""
+        button = next((b for b in self.at.get("download_button") if b.label.startswith(label)), None)
+        if button is None:
+            raise KeyError(f"Download '{label}' nicht gefunden")
+        url = App.media_files.execute_deferred(button.proto.deferred_file_id)
+        return App.media_files._storage.get_file(url.rsplit("/", 1)[-1].split(".")[0]).content
+
+    def edit_grid(self, edited_rows):
+        """Ändert Zellen im Paarungs-Editor, z.B. ``{0: {"A1": "Anna"}}``.
+
+        AppTest kennt ``st.data_editor`` nicht als Widget; der geänderte Zustand
+        wird daher so mitgeschickt, wie ihn der Browser senden würde.
+        """
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        editor = next(d for d in self.at.dataframe if "pairing_editor_" in d.proto.id)
+        states = self.at._tree.get_widget_states()
+        states.widgets.append(WidgetState(id=editor.proto.id, string_value=json.dumps({
+            "edited_rows": {str(row): cells for row, cells in edited_rows.items()},
+            "added_rows": [], "deleted_rows": [],
+        })))
+        self.at._run(states)
+        if self.at.exception:
+            raise RuntimeError(f"Exception in der Webapp: {self.at.exception[0].value}")
+        self.timings.append(metrics.REGISTRY.last("rerun"))
+
+    @property
+    def state(self):
+        return self.at.session_state
+
+    def snapshot(self):
+        return {key: copy.deepcopy(self.state[key]) for key in ROUNDTRIP_KEYS}
+
+
+# Invarianten; jede liefert eine Liste von Problemen
+
+def check_round_players(state):
+    problems = []
+    for rnd, round_log in enumerate(state['result_log'], start=1):
+        pids = [p for t1, t2, _, _ in round_log for p in t1 + t2 if p != logik.NO_PLAYER]
+        if len(pids) != len(set(pids)):
+            problems.append(f"Runde {rnd}: Spieler mehrfach eingeteilt")
+    return problems
+
+
+def check_draw(state):
+    pids = [p for t1, t2 in state['matches'] for p in t1 + t2 if p != logik.NO_PLAYER]
+    problems = []
+    if len(pids) != len(set(pids)):
+        problems.append(f"Auslosung Runde {state['round'] + 1}: Spieler mehrfach eingeteilt")
+    inactive = [state['names'][p] for p in pids if state['status'][p] != logik.ACTIVE]
+    if inactive:
+        problems.append(f"Auslosung Runde {state['round'] + 1}: nicht aktiv ausgelost: {', '.join(inactive)}")
+    return problems
+
+
+def check_byes(state, always_active):
+    counts = {pid: 0 for pid in always_active}
+    for round_byes in state['bye_log']:
+        for pid in round_byes:
+            if pid in counts:
+                counts[pid] += 1
+    if counts and max(counts.values()) - min(counts.values()) > 1:
+        return [f"Freilose ungleich verteilt: {min(counts.values())} bis {max(counts.values())}"]
+    return []
+
+
+def check_standings(state):
+    recomputed = {key: copy.deepcopy(state[key]) for key in ("names", "round", "result_log", "bye_log", "scoring")}
+    wertung.rescore(recomputed)
+    problems = []
+    for key in ("scores", "differentials", "totals"):
+        if recomputed[key] != list(state[key]):
+            problems.append(f"{key} passen nicht zur History")
+    return problems
+
+
+def check_grid_edit(app, rng):
+    """Tauscht zwei Plätze über die Zellen des Paarungs-Editors und prüft das Ergebnis."""
+    rows = [list(t1) + list(t2) for t1, t2 in app.state['matches']]
+    seated = [(m, s) for m, row in enumerate(rows) for s, pid in enumerate(row) if pid != logik.NO_PLAYER]
+    (m1, s1), (m2, s2) = rng.sample(seated, 2)
+    a, b = rows[m1][s1], rows[m2][s2]
+    edits = {}
+    edits.setdefault(m1, {})[SLOT_COLUMNS[s1]] = app.state['names'][b]
+    edits.setdefault(m2, {})[SLOT_COLUMNS[s2]] = app.state['names'][a]
+    app.edit_grid(edits)
+    rows[m1][s1], rows[m2][s2] = b, a
+    if [list(t1) + list(t2) for t1, t2 in app.state['matches']] != rows:
+        return [f"Runde {app.state['round'] + 1}: Änderung im Paarungs-Editor nicht übernommen"]
+    return []
+
+
+def check_downloads(app):
+    """Erzeugt jeden Export und die übrigen Downloads einmal."""
+    problems = []
+    for table in ("rangliste", "runden", "matches"):
+        app.at.selectbox(key="export_table").set_value(table)
+        app.run()
+        for label, magic in EXPORT_DOWNLOADS.items():
+            problems += _check_download(app, f"{label} {table}", label, magic)
+    for label, magic in EXTRA_DOWNLOADS.items():
+        problems += _check_download(app, label, label, magic)
+    return problems
+
+
+def _check_download(app, name, label, magic):
+    try:
+        data = app.download(label)
+    except Exception as e:
+        return [f"Download {name}: {e}"]
+    if not data or (magic is not None and not data.startswith(magic)):
+        return [f"Download {name}: unerwarteter Inhalt {data[:20]!r}"]
+    return []
+
+
+def check_roundtrip(before, after):
+    return [f"'{key}' nach dem Laden verändert" for key in ROUNDTRIP_KEYS if before[key] != after[key]]
+
+
+def check_reload(app, label):
+    """Speichert auf dem Server und lädt in neuen Sessions – per "Session laden" und per Upload."""
+    before = app.snapshot()
+    app.click("💾 Auf Server speichern")
+    if any("geändert" in warning.value for warning in app.at.warning):
+        return [f"{label}: Speichern abgelehnt"]
+    with open(SESSION_FILE, "rb") as f:
+        data = f.read()
+    problems = []
+    restored = App()
+    restored.click("📂 Session laden")
+    problems += [f"{label}, Session laden: {p}" for p in check_roundtrip(before, restored.snapshot())]
+    uploaded = App()
+    uploaded.at.file_uploader[0].set_value((SESSION_FILE, data, "application/octet-stream"))
+    uploaded.run()
+    problems += [f"{label}, Hochladen: {p}" for p in check_roundtrip(before, uploaded.snapshot())]
+    return problems
+
+
+# Simulation
+
+def play_tournament(n_players, rounds, seed, log=print):
+    """Spielt ein Turnier durch die Oberfläche; liefert (Probleme, Laufzeiten je Runde).
+
+    ``seed`` legt die Aktionen des Prüfstands und die Auslosungen fest, ein
+    Turnier lässt sich damit exakt nachspielen.
+    """
+    rng = random.Random(seed)
+    app = App()
+    problems = []
+    latency = []
+    app.at.text_area[0].input("\n".join(f"Spieler {i:02d}" for i in range(n_players)))
+    app.click("📂 Liste laden")
+    app.state['seed'] = seed
+    always_active = set(app.state['players'])
+    paused = []
+
+    for rnd in range(rounds):
+        start = len(app.timings)
+        # Ereignisse vor der Auslosung
+        if paused and rng.random() < 0.5:
+            app.at.selectbox(key="status_pid").set_value(paused.pop())
+            app.click("↩️ Wieder dabei")
+        elif rng.random() < 0.3 and len(logik.active_players(app.state)) > 5:
+            pid = rng.choice(sorted(always_active))
+            always_active.discard(pid)
+            paused.append(pid)
+            app.at.selectbox(key="status_pid").set_value(pid)
+            app.click("⏸️ Pausieren")
+        if rng.random() < 0.2:
+            app.at.text_input(key="new_player_form_input").input(f"Nachmeldung {rnd}")
+            app.click("➕ Hinzufügen")
+
+        app.click("🎲 Auslosen")
+        do_swap = rng.random() < 0.3 and app.state['byes']
+        do_grid = rng.random() < 0.3
+        if rnd == 0 or do_swap or do_grid:
+            app.click("✏️ Bearbeiten")
+            if rnd == 0 or do_grid:
+                problems += check_grid_edit(app, rng)
+            if rnd == 0:
+                # Speichern mit offenem Editor: dessen Widget-Zustand darf nicht in die Datei
+                problems += check_reload(app, f"Runde {rnd + 1}, Bearbeiten offen")
+            if do_swap:
+                swap = (rng.choice(sorted(app.state['slots'])), rng.choice(app.state['byes']))
+                # Von Hand vergebene Freilose zählen nicht für die Gleichverteilung
+                always_active.difference_update(swap)
+                app.at.selectbox(key="pairing_swap_a").set_value(swap[0])
+                app.at.selectbox(key="pairing_swap_b").set_value(swap[1])
+                app.click("🔁 Tauschen")
+            app.click("✏️ Bearbeiten")
+        problems += check_draw(app.state)
+
+        # Erst ein ungültiges Ergebnis, das abgelehnt werden muss
+        n_matches = len(app.state['matches'])
+        if rng.random() < 0.3:
+            for i in range(n_matches):
+                app.at.text_input(key=f"res_{rnd}_{i}").input("9:9" if i == 0 else rng.choice(FAST4_RESULTS))
+            app.click("✅ Ergebnisse eintragen")
+            if app.state['round'] != rnd:
+                problems.append(f"Runde {rnd + 1}: ungültiges Ergebnis wurde übernommen")
+        for i in range(n_matches):
+            app.at.text_input(key=f"res_{rnd}_{i}").input(rng.choice(FAST4_RESULTS))
+        app.click("✅ Ergebnisse eintragen")
+        if app.state['round'] != rnd + 1:
+            problems.append(f"Runde {rnd + 1} wurde nicht eingetragen")
+            break
+
+        if rng.random() < 0.2:
+            app.at.selectbox(key="fix_round").set_value(rng.randint(1, rnd + 1))
+            app.at.text_input(key="fix_result").input(rng.choice(FAST4_RESULTS))
+            app.click("💾 Korrektur speichern")
+
+        problems += check_round_players(app.state)
+        problems += check_byes(app.state, always_active)
+        problems += check_standings(app.state)
+        latency.append((rnd + 1, [t for t in app.timings[start:] if t is not None]))
+
+    problems += check_downloads(app)
+    # Speichern und in neuen Sessions wieder laden
+    problems += check_reload(app, "Turnierende")
+    log(f"  {n_players} Spieler, {rounds} Runden, Seed {seed}: {len(problems)} Probleme")
+    return problems, latency
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spielt Turniere headless durch die Webapp und prüft Invarianten.")
+    parser.add_argument("--spieler", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--runden", type=int, default=6)
+    parser.add_argument("--turniere", type=int, default=1, help="Turniere je Spielerzahl")
+    parser.add_argument("--seed", type=int, default=1, help="Startwert für die Seeds der Turniere")
+    parser.add_argument("--turnier-seed", type=int, help="genau dieses Turnier spielen (z.B. aus einer Fehlermeldung)")
+    parser.add_argument("--max-rerun-ms", type=float, help="Budget für p90 der Skriptlaufzeit")
+    parser.add_argument("--startzeit", action="store_true", help="zusätzlich das Startzeit-Budget prüfen")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    failures = []
+    rows = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            for n_players in args.spieler:
+                for _ in range(args.turniere):
+                    # Jedes Turnier mit eigener session_backup.pkl und saison.sqlite
+                    os.chdir(tempfile.mkdtemp(dir=workdir))
+                    seed = args.turnier_seed if args.turnier_seed is not None else rng.randrange(2 ** 32)
+                    try:
+                        problems, latency = play_tournament(n_players, args.runden, seed)
+                    except RuntimeError as e:
+                        problems, latency = [str(e)], []
+                    failures += [f"{n_players} Spieler, Seed {seed}: {p}" for p in problems]
+                    for rnd, timings in latency:
+                        rows.append((n_players, rnd, timings))
+        finally:
+            os.chdir(cwd)
+
+    print("\nSkriptlaufzeit je Durchlauf [ms]")
+    print(f"{'Spieler':>8} {'Runde':>6} {'n':>4} {'p50':>8} {'p90':>8} {'max':>8}")
+    all_timings = []
+    for n_players, rnd, timings in rows:
+        all_timings += timings
+        print(
+            f"{n_players:>8} {rnd:>6} {len(timings):>4} {metrics.quantile(sorted(timings), 0.5) * 1000:>8.1f} "
+            f"{metrics.quantile(sorted(timings), 0.9) * 1000:>8.1f} {max(timings, default=0) * 1000:>8.1f}"
+        )
+    p90 = metrics.quantile(sorted(all_timings), 0.9) * 1000
+    print(f"gesamt p90: {p90:.1f} ms")
+    if args.max_rerun_ms is not None and p90 > args.max_rerun_ms:
+        failures.append(f"p90 der Skriptlaufzeit {p90:.1f} ms > {args.max_rerun_ms:.1f} ms")
+
+    if args.startzeit:
+        import schleifchenturnier_startup as startup
+
+        failures += startup.check_startup(startup.measure_startup())
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Alle Invarianten erfüllt")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
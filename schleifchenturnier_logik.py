@@ -0,0 +1,771 @@
+"""Turnierlogik ohne Streamlit-Abhängigkeit.
+
+Alle Funktionen arbeiten auf einem ``state``-Mapping (``st.session_state``
+oder ein normales ``dict``). Spieler werden über fortlaufende Integer-IDs
+geführt: ``names[id]`` ist der Anzeigename, ``scores[id]``,
+``differentials[id]`` und ``totals[id]`` sind nach ID indizierte Listen,
+``players`` ist die aktuelle Teilnehmerliste als geordnetes Dict
+``{id: None}``. Wer pausiert oder sich abgemeldet hat, bleibt in ``players``
+und behält seine Spalten; ``status[id]`` entscheidet über die Auslosung.
+``version`` wird bei jeder Änderung an Paarungen oder Ergebnissen erhöht.
+"""
+import copy
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import schleifchenturnier_ergebnis as ergebnis
+import schleifchenturnier_wertung as wertung
+
+NO_PLAYER = -1
+
+ACTIVE = "aktiv"
+PAUSED = "pausiert"
+WITHDRAWN = "abgemeldet"
+STATUSES = (ACTIVE, PAUSED, WITHDRAWN)
+
+# Ab so vielen Kandidaten lohnt sich die Auslosung in mehreren Prozessen.
+PARALLEL_CANDIDATES = 256
+
+# Schlüssel, die ensure_state() aus den übrigen Daten wieder aufbauen kann.
+REBUILDABLE_KEYS = (
+    "names", "name_ids", "aliases", "status", "result_log", "totals", "team_counts", "amendments",
+    "slots", "pairing_issues", "pending_results", "version", "format", "scoring", "bye_log", "seed", "draw_log",
+)
+
+
+def normalize_name(name):
+    """Vergleichsform eines Namens (Groß-/Kleinschreibung und Leerzeichen egal)."""
+    return " ".join(name.split()).casefold()
+
+
+def init_state(state):
+    """Legt fehlende Schlüssel im Session-State an."""
+    if 'players' not in state:
+        for key, value in INITIAL_STATE.items():
+            state[key] = copy.copy(value)
+        state['seed'] = new_seed()
+        return
+    ensure_state(state)
+
+
+def _build_initial_state():
+    state = {
+        'players': {},
+        'names': [],
+        'name_ids': {},
+        'aliases': [],
+        'status': [],
+        'scores': [],
+        'differentials': [],
+        'totals': [],
+        'round': 0,
+        'matches': [],
+        'byes': [],
+        'semifinals': None,
+        'manual_edit': False,
+        'result_log': [],
+        'recent_matches': [],
+        'draw_log': [],
+    }
+    ensure_state(state)
+    del state['seed']
+    return state
+
+
+def ensure_state(state):
+    """Migriert ältere Sessions (Spieler als Namen) und baut abgeleitete Daten auf."""
+    if 'names' not in state or not isinstance(state['players'], dict):
+        migrate_legacy_state(state)
+    if 'status' not in state:
+        state['status'] = [ACTIVE if pid in state['players'] else WITHDRAWN for pid in range(len(state['names']))]
+    if 'amendments' not in state:
+        state['amendments'] = []
+    if 'seed' not in state:
+        state['seed'] = new_seed()
+    if 'draw_log' not in state:
+        state['draw_log'] = []
+    if 'scoring' not in state:
+        state['scoring'] = wertung.DEFAULT_POLICY
+    if 'bye_log' not in state:
+        state['bye_log'] = [[] for _ in range(state['round'])]
+    if 'totals' not in state:
+        state['totals'] = [None] * len(state['names'])
+        for pid in range(len(state['names'])):
+            _recompute_totals(state, pid)
+    if 'team_counts' not in state:
+        team_counts = {}
+        for round_log in state['result_log']:
+            for t1, t2, score1, score2 in round_log:
+                if score1 is not None:
+                    _count_teams(team_counts, (t1, t2), 1)
+        state['team_counts'] = team_counts
+    if 'version' not in state:
+        state['version'] = 0
+    if 'format' not in state:
+        state['format'] = ergebnis.DEFAULT_FORMAT
+    if 'slots' not in state or 'pairing_issues' not in state:
+        set_matches(state, state['matches'], state['byes'])
+    if 'pending_results' not in state:
+        state['pending_results'] = {}
+
+
+def migrate_legacy_state(state):
+    """Überführt eine Session mit Namen als Schlüssel in das ID-Format."""
+    old_players = list(state.get('players', []))
+    old_scores = dict(state.pop('scores', {}))
+    old_diffs = dict(state.pop('differentials', {}))
+    rnd = state.get('round', 0)
+    for key in ('totals', 'team_counts'):
+        state.pop(key, None)
+
+    state['names'] = []
+    state['name_ids'] = {}
+    state['aliases'] = []
+    state.pop('status', None)
+    state['players'] = {}
+    for name in old_players:
+        state['players'][register_player(state, name)] = None
+    for name in old_scores:
+        register_player(state, name)
+
+    def pid_of(name):
+        return NO_PLAYER if name == "-" else register_player(state, name)
+
+    if 'result_log' in state:
+        result_log = [
+            [([pid_of(n) for n in t1], [pid_of(n) for n in t2], s1, s2) for t1, t2, s1, s2 in round_log]
+            for round_log in state['result_log']
+        ]
+    else:
+        result_log = []
+        for h_rnd, entries in state.get('history', []):
+            while len(result_log) < h_rnd:
+                result_log.append([])
+            for entry in entries:
+                teams, _, result = entry.rpartition(": ")
+                parsed = _parse_match_text(teams)
+                try:
+                    score1, score2 = map(int, result.split(":"))
+                except ValueError:
+                    continue
+                if parsed is None:
+                    continue
+                t1, t2 = parsed
+                result_log[h_rnd - 1].append(([pid_of(n) for n in t1], [pid_of(n) for n in t2], score1, score2))
+    state['result_log'] = result_log
+    state['matches'] = [([pid_of(n) for n in t1], [pid_of(n) for n in t2]) for t1, t2 in state.get('matches', [])]
+    state['byes'] = [pid_of(n) for n in state.get('byes', [])]
+    state['recent_matches'] = [
+        ([pid_of(n) for n in t1], [pid_of(n) for n in t2]) for t1, t2 in state.get('recent_matches', [])
+    ]
+    state['semifinals'] = None
+
+    amendments = []
+    for a in state.get('amendments', []):
+        parsed = _parse_match_text(a.get('paarung', ""))
+        if parsed is None:
+            continue
+        a = {k: v for k, v in a.items() if k != 'paarung'}
+        a['teams'] = ([pid_of(n) for n in parsed[0]], [pid_of(n) for n in parsed[1]])
+        amendments.append(a)
+    state['amendments'] = amendments
+
+    state['scores'] = []
+    state['differentials'] = []
+    for name in state['names']:
+        state['scores'].append(list(old_scores.get(name, ['X'] * rnd)))
+        state['differentials'].append(list(old_diffs.get(name, ['X'] * rnd)))
+
+    for key in ('history', 'team_history'):
+        state.pop(key, None)
+
+
+def _parse_match_text(text):
+    """Zerlegt "A & B vs C & D" in zwei Namenslisten."""
+    try:
+        left, right = text.split(" vs ")
+    except ValueError:
+        return None
+    return [n.strip() for n in left.split(" & ")], [n.strip() for n in right.split(" & ")]
+
+
+# Spielerverwaltung
+
+def register_player(state, name):
+    """Liefert die ID zu einem Namen oder Alias und legt neue Spieler bei Bedarf an."""
+    key = normalize_name(name)
+    pid = state['name_ids'].get(key)
+    if pid is not None:
+        return pid
+    pid = len(state['names'])
+    state['names'].append(name.strip())
+    state['aliases'].append([])
+    if 'status' in state:
+        state['status'].append(WITHDRAWN)
+    state['name_ids'][key] = pid
+    rnd = state.get('round', 0)
+    for key_ in ('scores', 'differentials'):
+        if key_ in state:
+            state[key_].append(['X'] * rnd)
+    if 'totals' in state:
+        state['totals'].append([0, 0, 0])
+    return pid
+
+
+def player_id(state, name):
+    """ID zu einem Namen oder Alias, ``None`` wenn unbekannt."""
+    return state['name_ids'].get(normalize_name(name))
+
+
+def name_of(state, pid):
+    return "-" if pid == NO_PLAYER else state['names'][pid]
+
+
+def rename_player(state, pid, new_name):
+    """Benennt einen Spieler um; der alte Name bleibt als Alias erhalten."""
+    new_name = new_name.strip()
+    key = normalize_name(new_name)
+    owner = state['name_ids'].get(key)
+    if owner is not None and owner != pid:
+        raise ValueError(f"Name '{new_name}' gehört bereits zu {state['names'][owner]}")
+    old_name = state['names'][pid]
+    if normalize_name(old_name) != key:
+        state['aliases'][pid].append(old_name)
+    state['name_ids'][key] = pid
+    state['names'][pid] = new_name
+    if new_name in state['aliases'][pid]:
+        state['aliases'][pid].remove(new_name)
+
+
+def add_alias(state, pid, alias):
+    key = normalize_name(alias)
+    owner = state['name_ids'].get(key)
+    if owner is not None and owner != pid:
+        raise ValueError(f"Name '{alias}' gehört bereits zu {state['names'][owner]}")
+    if owner is None:
+        state['name_ids'][key] = pid
+        state['aliases'][pid].append(alias.strip())
+
+
+def add_player(state, name):
+    """Nimmt einen Spieler (wieder) in die Auslosung auf; ``None`` wenn er schon aktiv ist.
+
+    Wer früher schon mitgespielt hat, bekommt seine bisherigen Ergebnisse zurück.
+    """
+    pid = register_player(state, name)
+    if pid in state['players'] and state['status'][pid] == ACTIVE:
+        return None
+    state['players'][pid] = None
+    state['status'][pid] = ACTIVE
+    return pid
+
+
+def set_status(state, pid, status):
+    if status not in STATUSES:
+        raise ValueError(f"Unbekannter Status: {status}")
+    state['status'][pid] = status
+    for m, _ in state.get('slots', {}).get(pid, ()):
+        state['pairing_issues'][m] = _match_issues(state, m)
+
+
+def remove_player(state, pid):
+    """Meldet einen Spieler ab; seine Ergebnisse bleiben in der Tabelle."""
+    set_status(state, pid, WITHDRAWN)
+
+
+def load_players(state, names):
+    """Setzt die Teilnehmerliste neu. Bisherige Teilnehmer ohne Spiele fallen
+    heraus, alle anderen werden abgemeldet."""
+    previous = list(state['players'])
+    state['players'] = {}
+    for pid in previous:
+        if state['totals'][pid][2]:
+            state['players'][pid] = None
+            state['status'][pid] = WITHDRAWN
+    for n in names:
+        add_player(state, n)
+
+
+def players_with_status(state, statuses):
+    status = state['status']
+    return [pid for pid in state['players'] if status[pid] in statuses]
+
+
+def active_players(state):
+    """Spieler, die an der nächsten Auslosung teilnehmen."""
+    return players_with_status(state, (ACTIVE,))
+
+
+# Runden und Ergebnisse
+
+def team_key(team):
+    """Eindeutiger Key für ein Team (2 Spieler-IDs)"""
+    return tuple(sorted(team))
+
+
+def has_played_together(state, team):
+    return team_key(team) in state['team_counts']
+
+
+def format_match(state, t1, t2):
+    return f"{name_of(state, t1[0])} & {name_of(state, t1[1])} vs {name_of(state, t2[0])} & {name_of(state, t2[1])}"
+
+
+def format_result(score1, score2):
+    return "nicht gespielt" if score1 is None else f"{score1}:{score2}"
+
+
+def history_lines(state, rnd):
+    """Anzeigezeilen der gespielten Matches einer Runde."""
+    return [
+        f"{format_match(state, t1, t2)}: {score1}:{score2}"
+        for t1, t2, score1, score2 in state['result_log'][rnd - 1]
+        if score1 is not None
+    ]
+
+
+def match_outcome(t1, t2, score1, score2, policy=None):
+    """Liefert {Spieler-ID: (Differenz, Schleifchen)} für ein gespieltes Match."""
+    policy = policy or wertung.POLICIES[wertung.DEFAULT_POLICY]
+    cell1 = wertung.match_cell(policy, score1, score2)
+    cell2 = wertung.match_cell(policy, score2, score1)
+    outcome = {p: cell1 for p in t1}
+    outcome.update((p, cell2) for p in t2)
+    outcome.pop(NO_PLAYER, None)
+    return outcome
+
+
+def _count_teams(team_counts, teams, delta):
+    for team in teams:
+        if NO_PLAYER in team:
+            continue
+        key = team_key(team)
+        count = team_counts.get(key, 0) + delta
+        if count > 0:
+            team_counts[key] = count
+        else:
+            team_counts.pop(key, None)
+
+
+def _recompute_totals(state, pid):
+    scores = [x for x in state['scores'][pid] if x != 'X']
+    diffs = [d for d in state['differentials'][pid] if d != 'X']
+    # Gewertete Freilose zählen mit, aber nicht als Spiel
+    byes = sum(
+        1 for rnd, round_byes in enumerate(state['bye_log'])
+        if pid in round_byes and state['scores'][pid][rnd] != 'X'
+    )
+    state['totals'][pid] = [sum(scores), sum(diffs), len(scores) - byes]
+
+
+def _apply_cell(state, pid, rnd_idx, diff, point):
+    """Setzt eine Zelle in Siege/Differenz und korrigiert die Summen um das Delta."""
+    totals = state['totals'][pid]
+    old_point = state['scores'][pid][rnd_idx]
+    old_diff = state['differentials'][pid][rnd_idx]
+    if old_point != 'X':
+        totals[0] -= old_point
+        totals[1] -= old_diff
+        totals[2] -= 1
+    if point != 'X':
+        totals[0] += point
+        totals[1] += diff
+        totals[2] += 1
+    state['scores'][pid][rnd_idx] = point
+    state['differentials'][pid][rnd_idx] = diff
+
+
+def record_round(state, results):
+    """Trägt die Ergebnisse der aktuellen Runde ein.
+
+    ``results`` enthält pro Match in ``state['matches']`` ein Tupel
+    ``(score1, score2)`` oder ``None``, wenn das Match nicht gespielt wurde.
+    """
+    policy = wertung.policy_of(state)
+    round_results = {}
+    round_log = []
+    for (t1, t2), result in zip(state['matches'], results):
+        if result is None:
+            round_log.append((list(t1), list(t2), None, None))
+            continue
+        score1, score2 = result
+        round_results.update(match_outcome(t1, t2, score1, score2, policy))
+        round_log.append((list(t1), list(t2), score1, score2))
+        _count_teams(state['team_counts'], (t1, t2), 1)
+
+    byes = set(state['byes'])
+    bye_result = wertung.bye_cell(policy)
+    for pid in range(len(state['names'])):
+        played = pid in round_results
+        d, s = round_results[pid] if played else bye_result if pid in byes else ('X', 'X')
+        state['scores'][pid].append(s)
+        state['differentials'][pid].append(d)
+        if s != 'X':
+            totals = state['totals'][pid]
+            totals[0] += s
+            totals[1] += d
+            totals[2] += played
+
+    state['result_log'].append(round_log)
+    state['bye_log'].append(sorted(byes - set(round_results)))
+    state['round'] += 1
+    set_matches(state, state['matches'], state['byes'])
+
+
+def amend_result(state, rnd, match_idx, new_result, note=""):
+    """Korrigiert das Ergebnis eines Matches aus einer gespielten Runde.
+
+    Nur die vier beteiligten Spieler und die betroffenen Team-Zähler werden
+    angepasst; ``new_result`` ist ``(score1, score2)`` oder ``None`` für
+    "nicht gespielt".
+    """
+    if not 1 <= rnd <= len(state['result_log']):
+        raise ValueError(f"Runde {rnd} wurde noch nicht gespielt")
+    round_log = state['result_log'][rnd - 1]
+    if not 0 <= match_idx < len(round_log):
+        raise ValueError(f"Match {match_idx + 1} existiert in Runde {rnd} nicht")
+
+    t1, t2, old1, old2 = round_log[match_idx]
+    old_result = None if old1 is None else (old1, old2)
+    if old_result == new_result:
+        return False
+
+    outcome = {p: ('X', 'X') for p in t1 + t2 if p != NO_PLAYER}
+    if new_result is not None:
+        outcome.update(match_outcome(t1, t2, *new_result, wertung.policy_of(state)))
+    for pid, (diff, point) in outcome.items():
+        _apply_cell(state, pid, rnd - 1, diff, point)
+
+    if old_result is not None:
+        _count_teams(state['team_counts'], (t1, t2), -1)
+    if new_result is not None:
+        _count_teams(state['team_counts'], (t1, t2), 1)
+
+    new1, new2 = new_result if new_result is not None else (None, None)
+    round_log[match_idx] = (t1, t2, new1, new2)
+
+    state['amendments'].append({
+        "zeit": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "runde": rnd,
+        "match": match_idx + 1,
+        "teams": (list(t1), list(t2)),
+        "alt": format_result(old1, old2),
+        "neu": format_result(new1, new2),
+        "notiz": note,
+    })
+    state['version'] += 1
+    return True
+
+
+# Ergebnisse von außen (Offline-Eingabe am Platz)
+#
+# Jedes Match hat die ID "Runde.Match" (1-basiert). Ergebnisse der laufenden
+# Runde landen zunächst in ``pending_results``; sobald alle Matches der Runde
+# ein Ergebnis haben, wird die Runde eingetragen. Ein Stapel wird ganz oder
+# gar nicht übernommen.
+
+NEW = "neu"
+DUPLICATE = "doppelt"
+CONFLICT = "konflikt"
+INVALID = "ungültig"
+
+
+def match_id(rnd, match_idx):
+    return f"{rnd}.{match_idx + 1}"
+
+
+def parse_match_id(mid):
+    rnd, match = str(mid).split(".")
+    return int(rnd), int(match) - 1
+
+
+def round_open(state):
+    """Sind die aktuellen Matches schon für die nächste, noch offene Runde ausgelost?"""
+    return bool(state['matches']) and bool(state['draw_log']) and state['draw_log'][-1]['runde'] == state['round'] + 1
+
+
+def _batch_entry(state, entry, planned):
+    """Prüft einen Eintrag gegen den Stand inklusive der bereits geplanten Einträge des Stapels."""
+    try:
+        rnd, m = parse_match_id(entry['match'])
+        result = entry['ergebnis']
+        if result is not None:
+            if not isinstance(result, (list, tuple)):
+                raise TypeError
+            score1, score2 = (int(v) for v in result)
+            result = (score1, score2)
+        teams = [list(t) for t in entry.get('teams', ())]
+    except (KeyError, TypeError, ValueError):
+        return INVALID, "Match-ID, Paarung oder Ergebnis unlesbar", None
+    if result is None:
+        return INVALID, "kein Ergebnis", None
+    if not ergebnis.valid_score(state['format'], *result):
+        return INVALID, f"{format_result(*result)} passt nicht zum Spielformat", None
+
+    if rnd == state['round'] + 1 and round_open(state) and 0 <= m < len(state['matches']):
+        t1, t2 = state['matches'][m]
+        current = planned.get((rnd, m), state['pending_results'].get(m))
+    elif 1 <= rnd <= len(state['result_log']) and 0 <= m < len(state['result_log'][rnd - 1]):
+        t1, t2, score1, score2 = state['result_log'][rnd - 1][m]
+        current = planned.get((rnd, m), None if score1 is None else (score1, score2))
+    else:
+        return CONFLICT, "Match gibt es nicht (mehr)", None
+
+    if entry.get('version') != state['version'] and teams != [list(t1), list(t2)]:
+        return CONFLICT, "Paarung wurde geändert", None
+    if current == result:
+        return DUPLICATE, "schon eingetragen", None
+    if current is not None:
+        return CONFLICT, f"anderes Ergebnis eingetragen ({format_result(*current)})", None
+    return NEW, "", (rnd, m, result)
+
+
+def apply_result_batch(state, entries, note="Offline-Eingabe"):
+    """Übernimmt einen Stapel Ergebnisse in einem Schritt.
+
+    ``entries`` sind Dicts mit ``match`` (ID), ``teams`` (Spieler-IDs wie
+    beim Abruf gesehen), ``ergebnis`` (``[score1, score2]``) und ``version``.
+    Liefert ``(übernommen, [(match, status, hinweis), ...])``. Doppelte
+    Einträge sind unschädlich; gibt es einen Konflikt oder einen ungültigen
+    Eintrag, bleibt der Stand unverändert.
+    """
+    planned = {}
+    report = []
+    for entry in entries:
+        status, message, change = _batch_entry(state, entry, planned)
+        report.append((entry.get('match'), status, message))
+        if change:
+            rnd, m, result = change
+            planned[(rnd, m)] = result
+    if any(status in (CONFLICT, INVALID) for _, status, _ in report):
+        return False, report
+    if not planned:
+        return True, report
+
+    current = state['round'] + 1
+    for (rnd, m), result in planned.items():
+        if rnd == current:
+            state['pending_results'][m] = result
+        else:
+            amend_result(state, rnd, m, result, note)
+    state['version'] += 1
+
+    # Runde vollständig: Tabellen einmal für den ganzen Stapel fortschreiben
+    pending = state['pending_results']
+    if round_open(state) and all(m in pending for m in range(len(state['matches']))):
+        record_round(state, [pending[m] for m in range(len(state['matches']))])
+    return True, report
+
+
+# Auslosung
+#
+# Jede Auslosung ist durch (Seed des Turniers, Runde, Versuch, Kandidat)
+# festgelegt. ``draw_log`` speichert dazu die ausgeloste Spielerliste, sodass
+# sich jede Runde mit regenerate_draw() exakt nachvollziehen lässt.
+
+def new_seed():
+    return random.SystemRandom().randrange(2 ** 32)
+
+
+def seed_key(seed, rnd, attempt, candidate):
+    return f"{seed}:{rnd}:{attempt}:{candidate}"
+
+
+def draw_pool(state):
+    """Aktive Spieler mit der Zahl ihrer Spiele, in fester Reihenfolge."""
+    totals = state['totals']
+    return [(pid, totals[pid][2]) for pid in active_players(state)]
+
+
+def draw_candidate(pool, key):
+    """Lost eine Runde aus: Spieler mit wenigen Spielen zuerst, innerhalb
+    gleicher Spielzahl zufällig; wer übrig bleibt, hat spielfrei."""
+    rng = random.Random(key)
+    grouped = defaultdict(list)
+    for pid, games in pool:
+        grouped[games].append(pid)
+
+    ordered = []
+    for games in sorted(grouped):
+        grp = grouped[games]
+        rng.shuffle(grp)
+        ordered.extend(grp)
+
+    playing = len(ordered) // 4 * 4
+    matches = [
+        ([ordered[i], ordered[i + 1]], [ordered[i + 2], ordered[i + 3]])
+        for i in range(0, playing, 4)
+    ]
+    return matches, ordered[playing:]
+
+
+def draw_cost(matches, team_counts):
+    """Wie oft die ausgelosten Teams schon zusammen gespielt haben."""
+    return sum(team_counts.get(team_key(team), 0) for t1, t2 in matches for team in (t1, t2))
+
+
+def _score_candidate(args):
+    pool, key, team_counts = args
+    matches, byes = draw_candidate(pool, key)
+    return draw_cost(matches, team_counts), matches, byes
+
+
+def best_draw(pool, team_counts, seed, rnd, attempt, candidates=1, workers=None, time_budget=None, executor=None):
+    """Erzeugt bis zu ``candidates`` Auslosungen und liefert
+    ``(kandidat, kosten, matches, byes)`` der günstigsten.
+
+    ``workers=None`` rechnet erst ab PARALLEL_CANDIDATES Kandidaten in
+    mehreren Prozessen. ``time_budget`` (Sekunden) bricht die Suche ohne
+    Prozesse früher ab; der gewählte Kandidat bleibt über seinen Index
+    reproduzierbar. Mit ``executor`` wird ein bereits laufender Prozesspool
+    wiederverwendet, statt für jede Auslosung einen neuen zu starten.
+    """
+    if workers is None:
+        workers = (os.cpu_count() or 1) if candidates >= PARALLEL_CANDIDATES else 1
+    jobs = [(pool, seed_key(seed, rnd, attempt, k), team_counts) for k in range(candidates)]
+    if workers > 1 and candidates > 1:
+        chunksize = max(1, candidates // (4 * workers))
+        if executor is not None:
+            scored = list(executor.map(_score_candidate, jobs, chunksize=chunksize))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                scored = list(executor.map(_score_candidate, jobs, chunksize=chunksize))
+    else:
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        scored = []
+        for job in jobs:
+            scored.append(_score_candidate(job))
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+    best = min(range(len(scored)), key=lambda k: scored[k][0])
+    cost, matches, byes = scored[best]
+    return best, cost, matches, byes
+
+
+def draw_round(state, candidates=1, workers=None, time_budget=None, executor=None):
+    """Lost die nächste Runde aus, übernimmt den günstigsten Kandidaten und protokolliert ihn."""
+    rnd = state['round'] + 1
+    attempt = sum(1 for entry in state['draw_log'] if entry['runde'] == rnd)
+    pool = draw_pool(state)
+    candidate, cost, matches, byes = best_draw(
+        pool, state['team_counts'], state['seed'], rnd, attempt, candidates, workers, time_budget, executor
+    )
+    set_matches(state, matches, byes)
+    state['draw_log'].append({
+        "runde": rnd,
+        "versuch": attempt,
+        "kandidat": candidate,
+        "kandidaten": candidates,
+        "kosten": cost,
+        "pool": pool,
+    })
+    return cost
+
+
+def regenerate_draw(state, log_idx):
+    """Erzeugt die protokollierte Auslosung ``draw_log[log_idx]`` erneut."""
+    entry = state['draw_log'][log_idx]
+    key = seed_key(state['seed'], entry['runde'], entry['versuch'], entry['kandidat'])
+    return draw_candidate(entry['pool'], key)
+
+
+# Paarungen bearbeiten
+#
+# ``slots`` ordnet jeder Spieler-ID ihre Plätze ``(match, platz)`` in den
+# aktuellen Matches zu (Platz 0/1 = Team A, 2/3 = Team B). Damit lassen sich
+# Spieler in O(1) finden und tauschen, und nach einer Änderung werden nur die
+# betroffenen Matches in ``pairing_issues`` neu geprüft.
+
+def set_matches(state, matches, byes):
+    """Übernimmt neue Paarungen und prüft sie einmal komplett."""
+    state['matches'] = [(list(t1), list(t2)) for t1, t2 in matches]
+    state['byes'] = list(byes)
+    slots = {}
+    for m, (t1, t2) in enumerate(state['matches']):
+        for s, pid in enumerate(t1 + t2):
+            if pid != NO_PLAYER:
+                slots.setdefault(pid, []).append((m, s))
+    state['slots'] = slots
+    state['pairing_issues'] = {m: _match_issues(state, m) for m in range(len(state['matches']))}
+    state['pending_results'] = {}
+    state['version'] = state.get('version', 0) + 1
+
+
+def slot_player(state, m, s):
+    return state['matches'][m][s // 2][s % 2]
+
+
+def set_slot(state, m, s, pid):
+    """Setzt einen Platz in einer Paarung und prüft nur die betroffenen Matches neu."""
+    slots = state['slots']
+    old = slot_player(state, m, s)
+    if old == pid:
+        return
+    affected = {m}
+    if old != NO_PLAYER:
+        slots[old].remove((m, s))
+        affected.update(mi for mi, _ in slots[old])
+        if not slots[old]:
+            del slots[old]
+            if state['status'][old] == ACTIVE:
+                state['byes'].append(old)
+    if pid != NO_PLAYER:
+        if pid in slots:
+            affected.update(mi for mi, _ in slots[pid])
+        else:
+            slots[pid] = []
+            if pid in state['byes']:
+                state['byes'].remove(pid)
+        slots[pid].append((m, s))
+    state['matches'][m][s // 2][s % 2] = pid
+    state['pending_results'].pop(m, None)
+    state['version'] += 1
+    for mi in affected:
+        state['pairing_issues'][mi] = _match_issues(state, mi)
+
+
+def swap_players(state, a, b):
+    """Tauscht die Plätze zweier Spieler; wer spielfrei ist, übernimmt den Platz des anderen."""
+    pos_a = state['slots'].get(a, [None])[0]
+    pos_b = state['slots'].get(b, [None])[0]
+    if pos_a is None and pos_b is None:
+        raise ValueError("Beide Spieler sind spielfrei")
+    if pos_a is not None:
+        set_slot(state, *pos_a, b)
+    if pos_b is not None:
+        set_slot(state, *pos_b, a)
+
+
+def _match_issues(state, m):
+    t1, t2 = state['matches'][m]
+    issues = []
+    if NO_PLAYER in t1 + t2:
+        issues.append("unvollständig")
+    for pid in dict.fromkeys(t1 + t2):
+        if pid == NO_PLAYER:
+            continue
+        if len(state['slots'].get(pid, ())) > 1:
+            issues.append(f"{name_of(state, pid)} doppelt")
+        if state['status'][pid] != ACTIVE:
+            issues.append(f"{name_of(state, pid)} {state['status'][pid]}")
+    for team in (t1, t2):
+        if NO_PLAYER not in team and team[0] != team[1] and has_played_together(state, team):
+            issues.append(f"{name_of(state, team[0])} & {name_of(state, team[1])} schon zusammen")
+    return issues
+
+
+def has_duplicate_players(state):
+    return any(len(positions) > 1 for positions in state['slots'].values())
+
+
+def sorted_ranking(state, statuses=None):
+    """Rangliste der Teilnehmer, optional nur mit den angegebenen Status."""
+    pids = state['players'] if statuses is None else players_with_status(state, statuses)
+    return sorted(pids, key=wertung.ranking_key(wertung.policy_of(state), state['totals']))
+
+
+# Vorlage für neue Sessions, einmal pro Prozess aufgebaut (ohne Seed)
+INITIAL_STATE = _build_initial_state()
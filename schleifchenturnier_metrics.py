@@ -0,0 +1,136 @@
+"""Leichtgewichtige Laufzeitmessung für Webapp und Tk-App.
+
+Messwerte landen pro Name in einem Ringpuffer fester Größe; Perzentile
+werden erst beim Abruf berechnet. Eine Messung kostet einen
+``perf_counter``-Aufruf und ein ``deque.append`` und kann daher im Betrieb
+eingeschaltet bleiben. Das Modul-Registry ``REGISTRY`` gilt für den ganzen
+Prozess, also für alle Streamlit-Sessions gemeinsam.
+
+Ist ``SCHLEIFCHENTURNIER_METRICS_FILE`` gesetzt, schreibt die Webapp nach
+jedem Durchlauf die Messwerte im Prometheus-Textformat dorthin (für den
+textfile collector des node_exporter).
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import ContextDecorator
+
+RING_SIZE = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+METRIC_NAME = "schleifchenturnier_phase_seconds"
+PROMETHEUS_FILE = os.environ.get("SCHLEIFCHENTURNIER_METRICS_FILE")
+
+
+class Registry:
+    def __init__(self, ring_size=RING_SIZE):
+        self.ring_size = ring_size
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._sums = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.ring_size)
+                self._counts[name] = 0
+                self._sums[name] = 0.0
+            samples.append(seconds)
+            self._counts[name] += 1
+            self._sums[name] += seconds
+
+    def last(self, name):
+        """Letzter Messwert oder ``None``."""
+        with self._lock:
+            samples = self._samples.get(name)
+            return samples[-1] if samples else None
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._sums.clear()
+
+    def summary(self, quantiles=QUANTILES):
+        """Je Messpunkt: (name, anzahl, summe, {quantil: sekunden}) über den Ringpuffer."""
+        with self._lock:
+            snapshot = [(name, self._counts[name], self._sums[name], sorted(s)) for name, s in self._samples.items()]
+        rows = []
+        for name, count, total, samples in sorted(snapshot):
+            rows.append((name, count, total, {q: quantile(samples, q) for q in quantiles}))
+        return rows
+
+    def prometheus_text(self, quantiles=QUANTILES):
+        """Messwerte im Prometheus-Textformat (Typ summary)."""
+        lines = [
+            f"# HELP {METRIC_NAME} Laufzeit einzelner Phasen und Aktionen in Sekunden.",
+            f"# TYPE {METRIC_NAME} summary",
+        ]
+        for name, count, total, values in self.summary(quantiles):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for q, value in values.items():
+                lines.append(f'{METRIC_NAME}{{phase="{label}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{METRIC_NAME}_sum{{phase="{label}"}} {total:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{phase="{label}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Schreibt die Messwerte atomar in eine Datei (z.B. für den node_exporter textfile collector)."""
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+def quantile(sorted_samples, q):
+    """Quantil nach dem Nearest-Rank-Verfahren, 0.0 ohne Messwerte."""
+    if not sorted_samples:
+        return 0.0
+    idx = min(len(sorted_samples) - 1, max(0, math.ceil(q * len(sorted_samples)) - 1))
+    return sorted_samples[idx]
+
+
+REGISTRY = Registry()
+
+
+class timed(ContextDecorator):
+    """Misst einen Block oder eine Funktion: ``with timed("draw"):`` oder ``@timed("draw")``."""
+
+    def __init__(self, name, registry=None):
+        self.name = name
+        self.registry = registry or REGISTRY
+
+    def _recreate_cm(self):
+        # Als Dekorator eigene Instanz je Aufruf, damit parallele Sessions sich nicht stören
+        return timed(self.name, self.registry)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self._start)
+        return False
+
+
+class RerunTimer:
+    """Stoppuhr für einen Skriptdurchlauf: ``lap(name)`` misst die Zeit seit dem
+    letzten Aufruf, ``finish()`` den ganzen Durchlauf."""
+
+    def __init__(self, prefix="rerun", registry=None):
+        self.prefix = prefix
+        self.registry = registry or REGISTRY
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.registry.observe(f"{self.prefix}.{name}", now - self._last)
+        self._last = now
+
+    def finish(self):
+        now = time.perf_counter()
+        self.registry.observe(self.prefix, now - self._start)
+        self._last = now
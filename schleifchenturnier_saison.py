@@ -0,0 +1,278 @@
+"""Saisonwertung über mehrere Schleifchenturniere.
+
+Abgeschlossene Turniere werden in eine SQLite-Datei übernommen. Beim
+Hinzufügen eines Turniers werden die kumulierten Tabellen (Rangliste,
+Partner-Statistik, Anwesenheit) nur um dessen Beitrag erhöht; ältere
+Turniere werden dafür nicht wieder gelesen. Abfragen laufen über Indizes
+auf diesen Tabellen.
+
+    python schleifchenturnier_saison.py add session_backup.pkl --name "Turnier 12.10."
+    python schleifchenturnier_saison.py rangliste
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import schleifchenturnier_logik as logik
+
+DEFAULT_PATH = "saison.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS player_names (
+    name_key TEXT PRIMARY KEY,
+    player_id INTEGER NOT NULL REFERENCES players(id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    datum TEXT NOT NULL,
+    runden INTEGER NOT NULL,
+    spieler INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    event_id INTEGER NOT NULL REFERENCES events(id),
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    platz INTEGER NOT NULL,
+    spiele INTEGER NOT NULL,
+    schleifchen INTEGER NOT NULL,
+    differenz INTEGER NOT NULL,
+    PRIMARY KEY (event_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS results_player ON results(player_id);
+CREATE TABLE IF NOT EXISTS event_pairs (
+    event_id INTEGER NOT NULL REFERENCES events(id),
+    p1 INTEGER NOT NULL,
+    p2 INTEGER NOT NULL,
+    spiele INTEGER NOT NULL,
+    schleifchen INTEGER NOT NULL,
+    PRIMARY KEY (event_id, p1, p2)
+);
+CREATE TABLE IF NOT EXISTS standings (
+    player_id INTEGER PRIMARY KEY REFERENCES players(id),
+    turniere INTEGER NOT NULL,
+    spiele INTEGER NOT NULL,
+    schleifchen INTEGER NOT NULL,
+    differenz INTEGER NOT NULL,
+    siege INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS standings_rank ON standings(schleifchen DESC, differenz DESC);
+CREATE INDEX IF NOT EXISTS standings_attendance ON standings(turniere DESC);
+CREATE TABLE IF NOT EXISTS pairs (
+    p1 INTEGER NOT NULL,
+    p2 INTEGER NOT NULL,
+    spiele INTEGER NOT NULL,
+    schleifchen INTEGER NOT NULL,
+    PRIMARY KEY (p1, p2)
+);
+CREATE INDEX IF NOT EXISTS pairs_rank ON pairs(schleifchen DESC, spiele DESC);
+CREATE INDEX IF NOT EXISTS pairs_p2 ON pairs(p2);
+"""
+
+
+def connect(path=DEFAULT_PATH, check_same_thread=True):
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _season_player(conn, state, pid):
+    """Saison-ID zu einem Turnierspieler; Name und Aliase werden abgeglichen."""
+    keys = [logik.normalize_name(n) for n in [state['names'][pid]] + state['aliases'][pid]]
+    for key in keys:
+        row = conn.execute("SELECT player_id FROM player_names WHERE name_key = ?", (key,)).fetchone()
+        if row:
+            season_id = row[0]
+            break
+    else:
+        season_id = conn.execute("INSERT INTO players (name) VALUES (?)", (state['names'][pid],)).lastrowid
+    conn.execute("UPDATE players SET name = ? WHERE id = ?", (state['names'][pid], season_id))
+    conn.executemany(
+        "INSERT OR IGNORE INTO player_names (name_key, player_id) VALUES (?, ?)",
+        [(key, season_id) for key in keys]
+    )
+    return season_id
+
+
+def _event_pairs(state, season_ids):
+    """Partner-Paare eines Turniers: {(p1, p2): [spiele, schleifchen]} mit Saison-IDs."""
+    pairs = {}
+    for rnd, round_log in enumerate(state['result_log']):
+        for t1, t2, score1, score2 in round_log:
+            if score1 is None:
+                continue
+            for team in (t1, t2):
+                if logik.NO_PLAYER in team or team[0] not in season_ids or team[1] not in season_ids:
+                    continue
+                point = state['scores'][team[0]][rnd]
+                key = tuple(sorted((season_ids[team[0]], season_ids[team[1]])))
+                stats = pairs.setdefault(key, [0, 0])
+                stats[0] += 1
+                stats[1] += point if point != 'X' else 0
+    return pairs
+
+
+def _apply_event(conn, event_id, sign):
+    """Addiert (sign=1) oder entfernt (sign=-1) den Beitrag eines Turniers zu den Saisontabellen."""
+    for player_id, platz, spiele, schleifchen, differenz in conn.execute(
+        "SELECT player_id, platz, spiele, schleifchen, differenz FROM results WHERE event_id = ?", (event_id,)
+    ).fetchall():
+        conn.execute(
+            "INSERT INTO standings (player_id, turniere, spiele, schleifchen, differenz, siege) "
+            "VALUES (?, 0, 0, 0, 0, 0) ON CONFLICT(player_id) DO NOTHING",
+            (player_id,)
+        )
+        conn.execute(
+            "UPDATE standings SET turniere = turniere + ?, spiele = spiele + ?, schleifchen = schleifchen + ?, "
+            "differenz = differenz + ?, siege = siege + ? WHERE player_id = ?",
+            (sign, sign * spiele, sign * schleifchen, sign * differenz, sign * (platz == 1), player_id)
+        )
+    for p1, p2, spiele, schleifchen in conn.execute(
+        "SELECT p1, p2, spiele, schleifchen FROM event_pairs WHERE event_id = ?", (event_id,)
+    ).fetchall():
+        conn.execute(
+            "INSERT INTO pairs (p1, p2, spiele, schleifchen) VALUES (?, ?, 0, 0) ON CONFLICT(p1, p2) DO NOTHING",
+            (p1, p2)
+        )
+        conn.execute(
+            "UPDATE pairs SET spiele = spiele + ?, schleifchen = schleifchen + ? WHERE p1 = ? AND p2 = ?",
+            (sign * spiele, sign * schleifchen, p1, p2)
+        )
+    conn.execute("DELETE FROM standings WHERE turniere <= 0")
+    conn.execute("DELETE FROM pairs WHERE spiele <= 0")
+
+
+def _delete_event(conn, event_id):
+    _apply_event(conn, event_id, -1)
+    conn.execute("DELETE FROM results WHERE event_id = ?", (event_id,))
+    conn.execute("DELETE FROM event_pairs WHERE event_id = ?", (event_id,))
+    conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+
+
+def add_event(conn, state, name, datum=None, replace=False):
+    """Übernimmt ein Turnier in die Saison (eine Transaktion).
+
+    Ein Turnier mit gleichem Namen wird nur mit ``replace=True`` ersetzt;
+    dabei wird sein alter Beitrag vorher abgezogen.
+    """
+    datum = datum or time.strftime("%Y-%m-%d")
+    with conn:
+        existing = conn.execute("SELECT id FROM events WHERE name = ?", (name,)).fetchone()
+        if existing:
+            if not replace:
+                raise ValueError(f"Turnier '{name}' ist schon in der Saison")
+            _delete_event(conn, existing[0])
+
+        ranking = [pid for pid in logik.sorted_ranking(state) if state['totals'][pid][2] > 0]
+        event_id = conn.execute(
+            "INSERT INTO events (name, datum, runden, spieler) VALUES (?, ?, ?, ?)",
+            (name, datum, state['round'], len(ranking))
+        ).lastrowid
+        season_ids = {pid: _season_player(conn, state, pid) for pid in ranking}
+        conn.executemany(
+            "INSERT INTO results (event_id, player_id, platz, spiele, schleifchen, differenz) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (event_id, season_ids[pid], place, state['totals'][pid][2], state['totals'][pid][0], state['totals'][pid][1])
+                for place, pid in enumerate(ranking, start=1)
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO event_pairs (event_id, p1, p2, spiele, schleifchen) VALUES (?, ?, ?, ?, ?)",
+            [(event_id, p1, p2, spiele, schleifchen) for (p1, p2), (spiele, schleifchen) in _event_pairs(state, season_ids).items()]
+        )
+        _apply_event(conn, event_id, 1)
+    return event_id
+
+
+def remove_event(conn, name):
+    with conn:
+        existing = conn.execute("SELECT id FROM events WHERE name = ?", (name,)).fetchone()
+        if not existing:
+            raise ValueError(f"Turnier '{name}' ist nicht in der Saison")
+        _delete_event(conn, existing[0])
+
+
+# Abfragen
+
+def events(conn):
+    return conn.execute("SELECT name, datum, runden, spieler FROM events ORDER BY datum, id").fetchall()
+
+
+def standings(conn, limit=None):
+    """Saisonrangliste: (spieler, turniere, spiele, schleifchen, differenz, turniersiege)."""
+    return conn.execute(
+        "SELECT p.name, s.turniere, s.spiele, s.schleifchen, s.differenz, s.siege "
+        "FROM standings s JOIN players p ON p.id = s.player_id "
+        "ORDER BY s.schleifchen DESC, s.differenz DESC LIMIT ?",
+        (-1 if limit is None else limit,)
+    ).fetchall()
+
+
+def attendance(conn, limit=None):
+    return conn.execute(
+        "SELECT p.name, s.turniere FROM standings s JOIN players p ON p.id = s.player_id "
+        "ORDER BY s.turniere DESC, p.name LIMIT ?",
+        (-1 if limit is None else limit,)
+    ).fetchall()
+
+
+def top_pairs(conn, limit=10, min_games=1):
+    """Erfolgreichste Partner-Paare: (spieler1, spieler2, spiele, schleifchen)."""
+    return conn.execute(
+        "SELECT a.name, b.name, x.spiele, x.schleifchen FROM pairs x "
+        "JOIN players a ON a.id = x.p1 JOIN players b ON b.id = x.p2 "
+        "WHERE x.spiele >= ? ORDER BY x.schleifchen DESC, x.spiele DESC LIMIT ?",
+        (min_games, limit)
+    ).fetchall()
+
+
+def player_partners(conn, name):
+    """Alle Partner eines Spielers: (partner, spiele, schleifchen)."""
+    row = conn.execute(
+        "SELECT player_id FROM player_names WHERE name_key = ?", (logik.normalize_name(name),)
+    ).fetchone()
+    if not row:
+        return []
+    return conn.execute(
+        "SELECT p.name, x.spiele, x.schleifchen FROM pairs x "
+        "JOIN players p ON p.id = CASE WHEN x.p1 = ? THEN x.p2 ELSE x.p1 END "
+        "WHERE x.p1 = ? OR x.p2 = ? ORDER BY x.schleifchen DESC, x.spiele DESC",
+        (row[0], row[0], row[0])
+    ).fetchall()
+
+
+def main(argv=None):
+    import schleifchenturnier_export as export
+
+    parser = argparse.ArgumentParser(description="Saisonwertung für Schleifchenturniere.")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    add = sub.add_parser("add", help="Gespeicherte Sessions zur Saison hinzufügen")
+    add.add_argument("sessions", nargs="+")
+    add.add_argument("--name", help="Turniername (Standard: Dateiname)")
+    add.add_argument("--datum")
+    add.add_argument("--replace", action="store_true")
+    sub.add_parser("rangliste")
+    sub.add_parser("paare")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    if args.cmd == "add":
+        for path in args.sessions:
+            name = args.name or os.path.splitext(os.path.basename(path))[0]
+            add_event(conn, export.load_session(path), name, args.datum, args.replace)
+            print(f"✅ {name}")
+    elif args.cmd == "rangliste":
+        for place, row in enumerate(standings(conn), start=1):
+            print(place, *row, sep="\t")
+    elif args.cmd == "paare":
+        for row in top_pairs(conn, limit=20):
+            print(*row, sep="\t")
+
+
+if __name__ == "__main__":
+    main()
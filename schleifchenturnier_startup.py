@@ -0,0 +1,113 @@
+"""Prüft die Startzeit der Webapp gegen ein festes Budget.
+
+    python schleifchenturnier_startup.py
+
+Gemessen wird in einem frischen Python-Prozess (also ohne bereits geladene
+Module) mit Streamlits AppTest: der erste Seitenaufruf nach dem Serverstart
+(Wandzeit inklusive Modul-Import) und der Skriptdurchlauf einer weiteren
+Session im selben Prozess (laut ``schleifchenturnier_metrics``, ohne den
+Aufwand von AppTest selbst). Außerdem darf pandas beim ersten Aufruf ohne
+Spieler noch nicht geladen sein – auch nicht, wenn wie im Betrieb schon eine
+Saison mit Turnieren vorliegt. Der Exit-Code ist 1, wenn ein Budget
+überschritten wird.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+WEBAPP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schleifchenturnier_webapp.py")
+
+# Sekunden; bewusst mit Luft für die langsame Turnierhalle-Hardware
+STARTUP_BUDGET_S = {
+    "erster Aufruf": 1.0,
+    "neue Session": 0.1,
+}
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+t = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_import = time.perf_counter() - t
+
+def script_seconds():
+    import schleifchenturnier_metrics as metrics
+    return sum(total for name, count, total, values in metrics.REGISTRY.summary() if name == "rerun")
+
+t = time.perf_counter()
+AppTest.from_file({webapp!r}, default_timeout=60).run()
+first = time.perf_counter() - t
+first_script = script_seconds()
+pandas_loaded = "pandas" in sys.modules
+
+AppTest.from_file({webapp!r}, default_timeout=60).run()
+second_script = script_seconds() - first_script
+
+print(json.dumps({{
+    "streamlit importieren": streamlit_import,
+    "erster Aufruf": first,
+    "Skript erster Aufruf": first_script,
+    "neue Session": second_script,
+    "pandas geladen": pandas_loaded,
+}}))
+"""
+
+
+def _season_with_event(cwd):
+    """Legt im Arbeitsverzeichnis eine Saison-Datenbank mit einem kleinen Turnier an."""
+    import schleifchenturnier_logik as logik
+    import schleifchenturnier_saison as saison
+
+    state = {}
+    logik.init_state(state)
+    logik.load_players(state, ["Anna", "Bert", "Carla", "Dirk"])
+    logik.set_matches(state, [([0, 1], [2, 3])], [])
+    logik.record_round(state, [(4, 2)])
+    conn = saison.connect(os.path.join(cwd, saison.DEFAULT_PATH))
+    try:
+        saison.add_event(conn, state, "Startzeit-Probe")
+    finally:
+        conn.close()
+
+
+def measure_startup(webapp=WEBAPP):
+    """Startzeiten in Sekunden aus einem frischen Prozess (Arbeitsverzeichnis temporär)."""
+    code = _CHILD.format(app_dir=os.path.dirname(webapp), webapp=webapp)
+    with tempfile.TemporaryDirectory() as cwd:
+        _season_with_event(cwd)
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def check_startup(timings, budget=STARTUP_BUDGET_S):
+    """Liste der Verstöße gegen das Budget (leer, wenn alles passt)."""
+    problems = [
+        f"{name}: {timings[name]:.3f} s > {limit:.3f} s"
+        for name, limit in budget.items() if timings[name] > limit
+    ]
+    if timings["pandas geladen"]:
+        problems.append("pandas wird schon beim ersten Aufruf geladen")
+    return problems
+
+
+def main():
+    timings = measure_startup()
+    for name, value in timings.items():
+        if name in STARTUP_BUDGET_S:
+            print(f"{name}: {value:.3f} s (Budget {STARTUP_BUDGET_S[name]:.3f} s)")
+        elif isinstance(value, float):
+            print(f"{name}: {value:.3f} s")
+        else:
+            print(f"{name}: {'ja' if value else 'nein'}")
+    problems = check_startup(timings)
+    for problem in problems:
+        print(f"❌ {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
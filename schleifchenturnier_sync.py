@@ -0,0 +1,284 @@
+"""Ergebnis-Eingabe am Platz, auch ohne WLAN.
+
+Ein kleiner HTTP-Server arbeitet auf der gespeicherten Session
+(``session_backup.pkl``); die Tablets am Platz benutzen den Kommandozeilen-
+Client. Der Client merkt sich die aktuelle Runde und sammelt Ergebnisse in
+einer lokalen JSON-Datei; ``senden`` überträgt alle gesammelten Ergebnisse als
+einen Stapel. Der Server übernimmt einen Stapel ganz oder gar nicht, erkennt
+doppelte Meldungen an der Match-ID und Konflikte an Paarung und Version.
+
+    python schleifchenturnier_sync.py server session_backup.pkl --port 8502
+    python schleifchenturnier_sync.py holen --server http://turnier:8502
+    python schleifchenturnier_sync.py eintragen 3.2 4:1
+    python schleifchenturnier_sync.py senden
+
+In der Webapp erscheinen gemeldete Ergebnisse nach "📂 Session laden" als
+Vorbelegung der Eingabefelder; ist eine Runde vollständig gemeldet, wird sie
+direkt eingetragen.
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import schleifchenturnier_ergebnis as ergebnis
+import schleifchenturnier_logik as logik
+
+DEFAULT_PORT = 8502
+DEFAULT_QUEUE = "ergebnisse_offline.json"
+TIMEOUT = 5
+
+
+def round_snapshot(state):
+    """Aktuelle Runde als JSON-taugliches Dict für die Clients."""
+    rnd = state['round'] + 1
+    pending = state['pending_results']
+    matches = state['matches'] if logik.round_open(state) else []
+    return {
+        "version": state['version'],
+        "format": state['format'],
+        "runde": rnd,
+        "matches": [
+            {
+                "id": logik.match_id(rnd, m),
+                "teams": [list(t1), list(t2)],
+                "paarung": logik.format_match(state, t1, t2),
+                "ergebnis": logik.format_result(*pending[m]) if m in pending else None,
+            }
+            for m, (t1, t2) in enumerate(matches)
+        ],
+    }
+
+
+def _write_atomic(path, data, mode="wb"):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, mode) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# Server
+
+class SessionFile:
+    """Session-Datei mit Lock; neu gelesen wird nur, wenn sie sich geändert hat."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._state = None
+        self._mtime = None
+
+    def load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            logik.ensure_state(state)
+            self._state, self._mtime = state, mtime
+        return self._state
+
+    def save(self, state):
+        _write_atomic(self.path, pickle.dumps(state))
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+
+def make_handler(session):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/runde":
+                return self._send(404, {"fehler": "unbekannter Pfad"})
+            with session.lock:
+                snapshot = round_snapshot(session.load())
+            self._send(200, snapshot)
+
+        def do_POST(self):
+            if self.path != "/ergebnisse":
+                return self._send(404, {"fehler": "unbekannter Pfad"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                entries = json.loads(self.rfile.read(length))["eintraege"]
+                if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+                    raise TypeError
+            except (ValueError, KeyError, TypeError):
+                return self._send(400, {"fehler": "Stapel nicht lesbar"})
+            with session.lock:
+                state = session.load()
+                applied, report = logik.apply_result_batch(state, entries)
+                if applied and any(status == logik.NEW for _, status, _ in report):
+                    session.save(state)
+                version = state['version']
+            self._send(200 if applied else 409, {
+                "uebernommen": applied,
+                "version": version,
+                "eintraege": [{"match": mid, "status": status, "hinweis": msg} for mid, status, msg in report],
+            })
+
+        def log_message(self, format, *args):
+            sys.stderr.write(f"[sync] {self.address_string()} {format % args}\n")
+
+    return Handler
+
+
+def serve(path, host="0.0.0.0", port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), make_handler(SessionFile(path)))
+    print(f"Ergebnis-Server für {path} auf http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# Client
+
+def load_queue(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"server": None, "runde": None, "eintraege": [], "konflikte": []}
+
+
+def save_queue(path, queue):
+    _write_atomic(path, json.dumps(queue, ensure_ascii=False, indent=1), mode="w")
+
+
+def _request(url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=TIMEOUT) as resp:
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def fetch_round(queue):
+    _, snapshot = _request(queue["server"] + "/runde")
+    queue["runde"] = snapshot
+    return snapshot
+
+
+def queue_result(queue, mid, text):
+    """Merkt ein Ergebnis lokal vor; ein neues Ergebnis für dasselbe Match ersetzt das alte."""
+    snapshot = queue["runde"]
+    match = next((m for m in (snapshot or {}).get("matches", []) if m["id"] == mid), None)
+    if match is None:
+        raise ValueError(f"Match {mid} ist in der gespeicherten Runde nicht bekannt – erst 'holen'")
+    result = ergebnis.parse_result(text, snapshot.get("format", ergebnis.DEFAULT_FORMAT))
+    if result is None:
+        raise ValueError("Kein Ergebnis angegeben")
+    queue["eintraege"] = [e for e in queue["eintraege"] if e["match"] != mid]
+    queue["eintraege"].append({
+        "match": mid, "teams": match["teams"], "ergebnis": list(result), "version": snapshot["version"],
+    })
+
+
+def send_queue(queue):
+    """Schickt alle vorgemerkten Ergebnisse als einen Stapel.
+
+    Konflikte und ungültige Einträge wandern nach ``konflikte``, der Rest wird
+    gleich noch einmal geschickt. Liefert den Bericht des Servers.
+    """
+    report = []
+    while queue["eintraege"]:
+        code, answer = _request(queue["server"] + "/ergebnisse", {"eintraege": queue["eintraege"]})
+        if code not in (200, 409):
+            raise ValueError(answer.get("fehler", f"Server antwortet mit {code}"))
+        report = answer["eintraege"]
+        if code == 200:
+            queue["eintraege"] = []
+            break
+        rejected = {e["match"] for e in report if e["status"] in (logik.CONFLICT, logik.INVALID)}
+        queue["konflikte"] += [
+            dict(e, hinweis=r["hinweis"]) for e, r in zip(queue["eintraege"], report) if e["match"] in rejected
+        ]
+        queue["eintraege"] = [e for e in queue["eintraege"] if e["match"] not in rejected]
+    return report
+
+
+def _print_round(queue):
+    snapshot = queue["runde"]
+    if not snapshot:
+        print("Noch keine Runde geholt.")
+        return
+    queued = {e["match"]: e["ergebnis"] for e in queue["eintraege"]}
+    print(f"Runde {snapshot['runde']} (Version {snapshot['version']})")
+    for m in snapshot["matches"]:
+        if m["id"] in queued:
+            mark = f"{queued[m['id']][0]}:{queued[m['id']][1]} (noch nicht gesendet)"
+        else:
+            mark = m["ergebnis"] or "-"
+        print(f"  {m['id']:>5}  {m['paarung']}  {mark}")
+    for e in queue["konflikte"]:
+        print(f"  ⚠️ {e['match']} {e['ergebnis'][0]}:{e['ergebnis'][1]} abgelehnt: {e['hinweis']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ergebnis-Eingabe am Platz mit Offline-Zwischenspeicher.")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE, help="lokale Zwischenspeicher-Datei")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("server", help="Ergebnis-Server auf einer Session-Datei starten")
+    p.add_argument("session")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p = sub.add_parser("holen", help="aktuelle Runde vom Server holen")
+    p.add_argument("--server", help="z.B. http://turnier:8502")
+    p = sub.add_parser("eintragen", help="Ergebnis lokal vormerken (geht auch offline)")
+    p.add_argument("match", help="Match-ID wie 3.2")
+    p.add_argument("ergebnis", help="z.B. 4:2")
+    sub.add_parser("senden", help="vorgemerkte Ergebnisse übertragen")
+    sub.add_parser("anzeigen", help="Runde und vorgemerkte Ergebnisse anzeigen")
+    p = sub.add_parser("verwerfen", help="abgelehnte Einträge löschen")
+    p.add_argument("match", nargs="?", help="nur diese Match-ID")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "server":
+        serve(args.session, args.host, args.port)
+        return 0
+
+    queue = load_queue(args.queue)
+    try:
+        if args.cmd == "holen":
+            queue["server"] = (args.server or queue["server"] or f"http://localhost:{DEFAULT_PORT}").rstrip("/")
+            fetch_round(queue)
+            _print_round(queue)
+        elif args.cmd == "eintragen":
+            queue_result(queue, args.match, args.ergebnis)
+            print(f"✅ {args.match} vorgemerkt ({len(queue['eintraege'])} noch nicht gesendet)")
+        elif args.cmd == "senden":
+            for entry in send_queue(queue):
+                print(f"  {entry['match']}: {entry['status']} {entry['hinweis']}".rstrip())
+            fetch_round(queue)
+            _print_round(queue)
+        elif args.cmd == "anzeigen":
+            _print_round(queue)
+        elif args.cmd == "verwerfen":
+            queue["konflikte"] = [e for e in queue["konflikte"] if args.match and e["match"] != args.match]
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    except (urllib.error.URLError, OSError) as e:
+        print(f"📴 Server nicht erreichbar ({e}) – Ergebnisse bleiben vorgemerkt.")
+        return 1
+    finally:
+        save_queue(args.queue, queue)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
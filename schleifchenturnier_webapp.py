@@ -1,21 +1,71 @@
 import streamlit as st
-import random
-from collections import defaultdict
-import pandas as pd
 import pickle
 import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import schleifchenturnier_ergebnis as ergebnis
+import schleifchenturnier_logik as logik
+import schleifchenturnier_export as export
+import schleifchenturnier_saison as saison
+import schleifchenturnier_metrics as metrics
+import schleifchenturnier_wertung as wertung
 
 ALLOWED_TYPES = (str, int, float, bool, list, dict)
-
-def save_session_to_file(filename="session_backup.pkl"):
-    """Speichert den Session-State sicher auf dem Server."""
-    with open(filename, "wb") as f:
-        pickle.dump(dict(st.session_state), f)
+# Was der Export aus dem Session-State liest
+EXPORT_STATE_KEYS = ("names", "players", "status", "totals", "scores", "differentials", "result_log", "round", "scoring")
+# Widget-Keys, die beim Laden einer Session nicht übernommen werden
+WIDGET_KEY_PREFIXES = (
+    "res_", "m_", "FormSubmitter:", "fix_", "rename_", "status_", "standings_",
+    "pairing_editor_", "pairing_swap_", "pairing_candidates", "pairing_version",
+    "export_", "season_", "metrics_", "format_", "scoring_", "save_",
+)
+
+def is_widget_key(key):
+    return key.startswith(WIDGET_KEY_PREFIXES) or key == "new_player_form_input"
+
+def session_data():
+    """Der speicherbare Teil des Session-States, ohne Widget-Zustände."""
+    return {
+        key: value for key, value in st.session_state.items()
+        if not is_widget_key(key) and isinstance(value, ALLOWED_TYPES)
+    }
+
+def stored_version(saved_state):
+    """Woran sich eine gespeicherte Session wiedererkennen lässt: (Seed, Version)."""
+    return saved_state.get("seed"), saved_state.get("version")
+
+def server_file_changed(filename="session_backup.pkl"):
+    """Wurde die Datei seit dem letzten Laden oder Speichern dieser Session verändert,
+    z.B. vom Ergebnis-Server (``schleifchenturnier_sync``)?"""
+    try:
+        with open(filename, "rb") as f:
+            saved_state = pickle.load(f)
+    except Exception:
+        return False  # fehlende oder unlesbare Datei darf ersetzt werden
+    return stored_version(saved_state) != st.session_state.get("save_file_version")
+
+def save_session_to_file(filename="session_backup.pkl", force=False):
+    """Speichert den Session-State sicher auf dem Server.
+
+    Hat sich die Datei seit dem letzten Laden geändert, wird sie nur mit
+    ``force`` überschrieben. Liefert, ob gespeichert wurde.
+    """
+    if not force and server_file_changed(filename):
+        return False
+    data = session_data()
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(data, f)
+    os.replace(tmp, filename)
+    st.session_state.save_file_version = stored_version(data)
+    return True
 
 def download_session_button(filename="schleifchenturnier_backup.pkl"):
     """Bietet die Session als Download-Button an."""
     buffer = io.BytesIO()
-    pickle.dump(dict(st.session_state), buffer)
+    pickle.dump(session_data(), buffer)
     buffer.seek(0)
     st.download_button(
         label="⬇️ Session herunterladen",
@@ -24,6 +74,40 @@ def download_session_button(filename="schleifchenturnier_backup.pkl"):
         mime="application/octet-stream"
     )
 
+def export_download_button(table, fmt, label, mime):
+    """Download-Button, der die Datei erst beim Klick Zeile für Zeile erzeugt."""
+    snapshot = {key: st.session_state[key] for key in EXPORT_STATE_KEYS}
+
+    def build():
+        # Streamlit hält den Download ohnehin ganz im Speicher und nimmt nur Bytes entgegen
+        fh = io.BytesIO()
+        if fmt == "csv":
+            text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+            export.export_table(snapshot, table, fmt, text)
+            text.flush()
+            text.detach()
+        else:
+            export.export_table(snapshot, table, fmt, fh)
+        return fh.getvalue()
+
+    st.download_button(
+        label=label,
+        data=build,
+        file_name=f"schleifchenturnier_{table}.{fmt}",
+        mime=mime,
+        key=f"export_{table}_{fmt}"
+    )
+
+@st.cache_resource
+def season_store():
+    """Eine Saison-Verbindung pro Serverprozess, von allen Sessions geteilt."""
+    return saison.connect(check_same_thread=False), threading.Lock()
+
+@st.cache_resource
+def draw_executor():
+    """Prozesspool für große Auslosungen; startet seine Prozesse erst bei Bedarf."""
+    return ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+
 def load_session_from_upload(uploaded_file):
     try:
         loaded_state = pickle.load(uploaded_file)
@@ -42,6 +126,7 @@ def load_session_from_file(filename="session_backup.pkl"):
         with open(filename, "rb") as f:
             loaded_state = pickle.load(f)
         apply_loaded_state(loaded_state)
+        st.session_state.save_file_version = stored_version(loaded_state)
 
         if "matches" in st.session_state and st.session_state.matches:
             st.session_state.session_loaded = True
@@ -55,39 +140,34 @@ def load_session_from_file(filename="session_backup.pkl"):
 def apply_loaded_state(loaded_state):
     """Überträgt geladene Daten sicher in den aktuellen Session-State."""
     for key, value in loaded_state.items():
-        if (
-            key.startswith("res_") or
-            key.startswith("m") or
-            key.startswith("FormSubmitter:") or
-            key == "new_player_form_input"
-        ):
+        if is_widget_key(key):
             continue
         if isinstance(value, ALLOWED_TYPES):
             st.session_state[key] = value
+    refresh_derived_state(loaded_state)
+
+def refresh_derived_state(loaded_state):
+    """Verwirft abgeleitete Daten, die nicht aus der geladenen Session stammen, und baut sie neu auf."""
+    for key in logik.REBUILDABLE_KEYS:
+        if key not in loaded_state:
+            st.session_state.pop(key, None)
+    logik.ensure_state(st.session_state)
 
+@metrics.timed("render_current_matches")
 def render_current_matches():
     if st.session_state.get("matches") and len(st.session_state.matches) > 0:
         st.subheader(f"📝 Runde {st.session_state.round + 1}")
 
-        all_old_teams = set()
-        for rnd, matches in st.session_state.history:
-            for m in matches:
-                parts = m.split(":")[0]
-                teams = parts.split(" vs ")
-                team1 = frozenset(teams[0].replace("&", "").split())
-                team2 = frozenset(teams[1].replace("&", "").split())
-                all_old_teams.add(team1)
-                all_old_teams.add(team2)
-
         # Eingabefelder vorbereiten
         if "results_input" not in st.session_state:
             st.session_state.results_input = {}
 
         for i, (t1, t2) in enumerate(st.session_state.matches):
-            team1_repeated = frozenset(t1) in all_old_teams
-            team2_repeated = frozenset(t2) in all_old_teams
+            team1_repeated = has_played_together_before(t1)
+            team2_repeated = has_played_together_before(t2)
 
-            def format_player(name, repeated):
+            def format_player(pid, repeated):
+                name = logik.name_of(st.session_state, pid)
                 return f"<span style='color:red'>{name}</span>" if repeated else name
 
             team1_names = f"{format_player(t1[0], team1_repeated)} & {format_player(t1[1], team1_repeated)}"
@@ -99,49 +179,43 @@ def render_current_matches():
                 unsafe_allow_html=True
             )
 
-            # Direkt darunter Eingabefeld für Ergebnis
-            st.session_state.results_input[i] = st.text_input(f"Ergebnis Match {i+1} (z.B. 4:2)", key=f"res_{st.session_state.round}_{i}")
+            # Direkt darunter Eingabefeld für Ergebnis, vorbelegt mit offline gemeldeten Ergebnissen
+            key = f"res_{st.session_state.round}_{i}"
+            pending = st.session_state.pending_results.get(i)
+            if pending is not None and not st.session_state.get(key):
+                st.session_state[key] = logik.format_result(*pending)
+            example = ergebnis.FORMATS[st.session_state.format]["beispiel"]
+            st.session_state.results_input[i] = st.text_input(f"Ergebnis Match {i+1} (z.B. {example})", key=key)
 
         # Spielfrei anzeigen
         if st.session_state.byes:
-            st.markdown("🛋️ Spielfrei: " + ", ".join(st.session_state.byes))
-
-def team_key_single(team):
-    """Eindeutiger Key für ein Team (2 Spieler)"""
-    return frozenset(team)
+            st.markdown("🛋️ Spielfrei: " + player_names(st.session_state.byes))
 
 def has_played_together_before(team):
     """Überprüft, ob ein Team schon einmal zusammengespielt hat."""
-    if 'team_history' not in st.session_state:
-        st.session_state.team_history = set()
-        return False
-    return team_key_single(team) in st.session_state.team_history
+    return logik.has_played_together(st.session_state, team)
+
+def player_names(pids):
+    return ", ".join(logik.name_of(st.session_state, p) for p in pids)
 
-def update_team_history(t1):
-    """Speichert ein Team als zusammen gespielt."""
-    if 'team_history' not in st.session_state:
-        st.session_state.team_history = set()
-    st.session_state.team_history.add(team_key_single(t1))
+def name_formatter():
+    """format_func für Auswahlfelder mit Spieler-IDs."""
+    names = st.session_state.names
+    return lambda p: "-" if p == logik.NO_PLAYER else names[p]
+
+def sorted_by_name(pids):
+    names = st.session_state.names
+    return sorted(pids, key=lambda p: names[p].casefold())
 
 st.set_page_config(page_title="Fast Four Tournament", layout="wide")
+rerun_timer = metrics.RerunTimer()
 
 def update_pair_history(t1, t2):
     st.session_state.pair_history.add(team_key(t1, t2))
 
 # Session state initialisieren
-if 'players' not in st.session_state:
-    st.session_state.players = []
-    st.session_state.scores = defaultdict(list)
-    st.session_state.differentials = defaultdict(list)
-    st.session_state.round = 0
-    st.session_state.matches = []
-    st.session_state.byes = []
-    st.session_state.semifinals = None
-    st.session_state.manual_edit = False
-    st.session_state.history = []
-    st.session_state.recent_matches = []
-    # st.session_state.t1=[]
-    # st.session_state.t2=[]
+logik.init_state(st.session_state)
+rerun_timer.lap("init")
 
 st.title("🎾 Fast 4")
 
@@ -151,13 +225,7 @@ st.header("📥 Spielerliste")
 loaded_names = st.text_area("Spieler (ein Name pro Zeile)")
 if st.button("📂 Liste laden"):
     names = [n.strip() for n in loaded_names.strip().split("\n") if n.strip()]
-    st.session_state.players = []
-    st.session_state.scores.clear()
-    st.session_state.differentials.clear()
-    for n in names:
-        st.session_state.players.append(n)
-        st.session_state.scores[n] = ['X'] * st.session_state.round
-        st.session_state.differentials[n] = ['X'] * st.session_state.round
+    logik.load_players(st.session_state, names)
 
 # Spieler-Eingabe & Verwaltung
 st.subheader("Liste bearbeiten")
@@ -167,46 +235,60 @@ with col1:
         new_player = st.text_input("Spieler hinzufügen", key="new_player_form_input")
         submit = st.form_submit_button("➕ Hinzufügen")
         if submit and new_player.strip():
-            if new_player not in st.session_state.players:
-                st.session_state.players.append(new_player)
-                st.session_state.scores[new_player] = ['X'] * st.session_state.round
-                st.session_state.differentials[new_player] = ['X'] * st.session_state.round
+            logik.add_player(st.session_state, new_player)
 
 with col2:
-    remove_player = st.selectbox("Spieler entfernen", [p for p in st.session_state.players])
-    if st.button("❌ Entfernen") and remove_player:
-        st.session_state.players.remove(remove_player)
-        del st.session_state.scores[remove_player]
-        del st.session_state.differentials[remove_player]
+    status_pid = st.selectbox(
+        "Spieler pausieren / entfernen", sorted_by_name(st.session_state.players),
+        format_func=name_formatter(), key="status_pid"
+    )
+    c1, c2, c3 = st.columns(3)
+    if c1.button("⏸️ Pausieren") and status_pid is not None:
+        logik.set_status(st.session_state, status_pid, logik.PAUSED)
+    if c2.button("❌ Entfernen") and status_pid is not None:
+        logik.remove_player(st.session_state, status_pid)
+    if c3.button("↩️ Wieder dabei") and status_pid is not None:
+        logik.set_status(st.session_state, status_pid, logik.ACTIVE)
+    if status_pid is not None:
+        st.caption(f"Status: {st.session_state.status[status_pid]}")
+
+with st.expander("✏️ Spieler umbenennen", expanded=False):
+    rename_pid = st.selectbox(
+        "Spieler", sorted_by_name(st.session_state.players),
+        format_func=name_formatter(), key="rename_pid"
+    )
+    new_name = st.text_input("Neuer Name", key="rename_name")
+    if st.button("💾 Umbenennen") and rename_pid is not None and new_name.strip():
+        try:
+            logik.rename_player(st.session_state, rename_pid, new_name)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+        else:
+            st.success(f"✅ Umbenannt in {new_name.strip()}")
+    if rename_pid is not None and st.session_state.aliases[rename_pid]:
+        st.caption("Frühere Namen: " + ", ".join(st.session_state.aliases[rename_pid]))
+rerun_timer.lap("roster")
 
 st.markdown("---")
 
 # Neue Runde auslosen & manuelle Bearbeitung
 st.header("🌀 Auslosung")
+def apply_format_choice():
+    st.session_state.format = st.session_state.format_choice
+
+st.session_state.format_choice = st.session_state.format
+st.selectbox(
+    "Spielformat", list(ergebnis.FORMATS), format_func=ergebnis.format_name,
+    key="format_choice", on_change=apply_format_choice,
+    help="Bestimmt, welche Ergebnisse gültig sind und was in die Tabelle eingeht."
+)
+candidates = st.number_input(
+    "Kandidaten pro Auslosung", min_value=1, max_value=5000, value=20, key="pairing_candidates",
+    help="Es wird die Auslosung mit den wenigsten bereits gespielten Teams genommen."
+)
 col1, col2 = st.columns(2)
 if col1.button("🎲 Auslosen"):
-    grouped = defaultdict(list)
-    for p in st.session_state.players:
-        played = sum(1 for x in st.session_state.scores[p] if x != 'X')
-        grouped[played].append(p)
-
-    grouped_players = []
-    for k in sorted(grouped):
-        grp = grouped[k]
-        random.shuffle(grp)
-        grouped_players.extend(grp)
-
-    matches, byes = [], grouped_players[:]
-    st.session_state.matches = []
-    st.session_state.byes = []
-
-    while len(byes) >= 4:
-        t1 = [byes.pop(0), byes.pop(0)]
-        t2 = [byes.pop(0), byes.pop(0)]
-        matches.append((t1, t2))
-
-    st.session_state.matches = matches
-    st.session_state.byes = byes
+    logik.draw_round(st.session_state, int(candidates), executor=draw_executor())
     st.session_state.results_input = {}
     st.session_state.manual_edit = False
 
@@ -217,171 +299,208 @@ if col1.button("🎲 Auslosen"):
 if col2.button("✏️ Bearbeiten"):
     st.session_state.manual_edit = not st.session_state.manual_edit
 
-if st.session_state.manual_edit:
-    st.markdown("**✏️ Bearbeite die Paarungen**")
-
-    used_players = set()
-    match_inputs = []
-
-    for idx, (t1, t2) in enumerate(st.session_state.matches):
-        c1, c2, c3, c4 = st.columns(4)
-        all_options = ["-"] + sorted(st.session_state.players)
-
-        # Vorbelegung
-        player1 = t1[0] if t1[0] in st.session_state.players else "-"
-        player2 = t1[1] if t1[1] in st.session_state.players else "-"
-        player3 = t2[0] if t2[0] in st.session_state.players else "-"
-        player4 = t2[1] if t2[1] in st.session_state.players else "-"
-
-        sel1 = c1.selectbox(f"Match {idx+1} – Team A1", all_options, index=all_options.index(player1), key=f"m_{idx}_a1")
-        sel2 = c2.selectbox(f"Team A2", all_options, index=all_options.index(player2), key=f"m_{idx}_a2")
-        sel3 = c3.selectbox(f"Team B1", all_options, index=all_options.index(player3), key=f"m_{idx}_b1")
-        sel4 = c4.selectbox(f"Team B2", all_options, index=all_options.index(player4), key=f"m_{idx}_b2")
-
-        match_inputs.append([sel1, sel2, sel3, sel4])
-
-    # Spieler-Verwendung prüfen & Konflikte auflösen
-    final_matches = []
-    assigned_players = set()
-
-    for inputs in match_inputs:
-        team1 = []
-        team2 = []
+if st.session_state.draw_log:
+    last_draw = st.session_state.draw_log[-1]
+    st.caption(
+        f"Seed {st.session_state.seed} · Runde {last_draw['runde']}, Versuch {last_draw['versuch'] + 1}, "
+        f"Kandidat {last_draw['kandidat'] + 1}/{last_draw['kandidaten']} · wiederholte Teams: {last_draw['kosten']}"
+    )
 
-        for sel in inputs[:2]:
-            if sel != "-" and sel not in assigned_players:
-                team1.append(sel)
-                assigned_players.add(sel)
-            else:
-                team1.append("-")
+SLOT_COLUMNS = ["A1", "A2", "B1", "B2"]
 
-        for sel in inputs[2:]:
-            if sel != "-" and sel not in assigned_players:
-                team2.append(sel)
-                assigned_players.add(sel)
-            else:
-                team2.append("-")
+def apply_pairing_edits(editor_key):
+    """Überträgt nur die geänderten Zellen des Paarungs-Editors in die Matches."""
+    for row, changes in st.session_state[editor_key]["edited_rows"].items():
+        for col, name in changes.items():
+            if col not in SLOT_COLUMNS:
+                continue
+            pid = logik.NO_PLAYER if name in (None, "-") else logik.player_id(st.session_state, name)
+            if pid is not None:
+                logik.set_slot(st.session_state, int(row), SLOT_COLUMNS.index(col), pid)
+    # Neuer Key, damit der Editor mit den übernommenen Paarungen neu startet
+    st.session_state.pairing_version = st.session_state.get("pairing_version", 0) + 1
 
-        final_matches.append((team1, team2))
+rerun_timer.lap("draw")
 
-    # Matches aktualisieren
-    st.session_state.matches = []
-    for team1, team2 in final_matches:
-        st.session_state.matches.append((team1, team2))
+if st.session_state.manual_edit:
+    import pandas as pd  # erst hier laden, das spart Zeit beim ersten Seitenaufruf
+    st.markdown("**✏️ Bearbeite die Paarungen**")
 
-    # Spielfrei neu berechnen
-    current_assigned = set()
-    for t1, t2 in st.session_state.matches:
-        current_assigned.update([p for p in t1 if p != "-"])
-        current_assigned.update([p for p in t2 if p != "-"])
+    names = name_formatter()
+    options = ["-"] + [names(p) for p in sorted_by_name(
+        logik.players_with_status(st.session_state, (logik.ACTIVE, logik.PAUSED))
+    )]
+    issues = st.session_state.pairing_issues
+    grid = pd.DataFrame(
+        [
+            [names(p) for p in t1 + t2] + [", ".join(issues.get(i, []))]
+            for i, (t1, t2) in enumerate(st.session_state.matches)
+        ],
+        columns=SLOT_COLUMNS + ["Hinweise"],
+        index=[f"Match {i+1}" for i in range(len(st.session_state.matches))],
+    )
+    editor_key = f"pairing_editor_{st.session_state.get('pairing_version', 0)}"
+    st.data_editor(
+        grid,
+        key=editor_key,
+        on_change=apply_pairing_edits,
+        args=(editor_key,),
+        disabled=["Hinweise"],
+        num_rows="fixed",
+        column_config={
+            col: st.column_config.SelectboxColumn(col, options=options, required=True)
+            for col in SLOT_COLUMNS
+        },
+    )
 
-    st.session_state.byes = sorted(set(st.session_state.players) - current_assigned)
+    swap_candidates = sorted_by_name(list(st.session_state.slots) + st.session_state.byes)
+    c1, c2, c3 = st.columns([2, 2, 1])
+    swap_a = c1.selectbox("Spieler", swap_candidates, format_func=names, key="pairing_swap_a")
+    swap_b = c2.selectbox("tauschen mit", swap_candidates, format_func=names, key="pairing_swap_b")
+    if c3.button("🔁 Tauschen") and swap_a is not None and swap_a != swap_b:
+        logik.swap_players(st.session_state, swap_a, swap_b)
+        st.rerun()
 
     if st.session_state.byes:
-        st.markdown("🛋️ **Aktualisierte Spielfrei-Liste:** " + ", ".join(st.session_state.byes))
+        st.markdown("🛋️ **Aktualisierte Spielfrei-Liste:** " + player_names(sorted_by_name(st.session_state.byes)))
+
+rerun_timer.lap("edit_mode")
 
 # Anzeige der Matches & Ergebnis-Eingabe
 render_current_matches()
 
 if st.button("✅ Ergebnisse eintragen"):
-    round_results = {}
-    history_entry = []
+    results = []
     valid = True
-    for i, (t1, t2) in enumerate(st.session_state.matches):
-        result = st.session_state.results_input[i].strip()
-        match_text = f"{t1[0]} & {t1[1]} vs {t2[0]} & {t2[1]}"
-        if not result:
-            for p in t1 + t2:
-                round_results[p] = ('X', 'X')
-            continue
-        try:
-            score1, score2 = map(int, result.split(":"))
-        except:
-            st.error(f"Ungültiges Ergebnis bei Match {i+1}")
+    if logik.has_duplicate_players(st.session_state):
+        st.error("Ein Spieler ist in mehreren Matches eingeteilt – bitte Paarungen korrigieren.")
+        valid = False
+    else:
+        results, errors = ergebnis.parse_results(
+            [st.session_state.results_input[i] for i in range(len(st.session_state.matches))],
+            st.session_state.format
+        )
+        if errors:
+            st.error("Ungültige Ergebnisse:\n" + "\n".join(f"- Match {i+1}: {message}" for i, message in errors))
             valid = False
-            break
-        if score1 > score2:
-            for p in t1:
-                round_results[p] = (score1 - score2, 1)
-            for p in t2:
-                round_results[p] = (score2 - score1, 0)
-        else:
-            for p in t1:
-                round_results[p] = (score1 - score2, 0)
-            for p in t2:
-                round_results[p] = (score2 - score1, 1)
-
-        history_entry.append(f"{match_text}: {score1}:{score2}")
 
     if valid:
-        for p in st.session_state.players:
-            if p in round_results:
-                d, s = round_results[p]
-                st.session_state.scores[p].append(s)
-                st.session_state.differentials[p].append(d)
-            else:
-                st.session_state.scores[p].append('X')
-                st.session_state.differentials[p].append('X')
-
-        # Neu: Teams zur History hinzufügen
-        for t1, t2 in st.session_state.matches:
-            update_team_history(t1)
-            update_team_history(t2)
-
-        st.session_state.history.append((st.session_state.round + 1, history_entry))
-        st.session_state.round += 1
+        logik.record_round(st.session_state, results)
         st.success("Runde erfolgreich gespeichert!")
+rerun_timer.lap("results")
 
 # Rangliste anzeigen
 st.markdown("---")
 st.header("📊 Rangliste")
-def sorted_ranking():
-    return sorted(
-        st.session_state.players,
-        key=lambda p: (
-            -sum(x for x in st.session_state.scores[p] if x != 'X'),
-            -sum(d for d in st.session_state.differentials[p] if d != 'X')
-        )
-    )
-
-def render_table(data_dict, title, bold_top8=False):
-    st.subheader(title)
-    ranking = sorted_ranking()
-    max_r = max((len(v) for v in data_dict.values()), default=0)
-    table = []
-    for i, p in enumerate(ranking):
-        row = {
-            "Spieler": f"{p}  (✓)" if bold_top8 and i < 8 else p,
-            "Spiele": sum(1 for x in data_dict[p] if x != 'X')
-        }
-        for r in range(max_r):
-            row[f"R{r+1}"] = data_dict[p][r] if r < len(data_dict[p]) else 'X'
-        row["∑"] = sum(x for x in data_dict[p] if x != 'X')
-        table.append(row)
-
-    df = pd.DataFrame(table)
-    df.index = [i+1 for i in range(len(df))]  # Start index at 1
-    st.dataframe(df)
-
-render_table(st.session_state.scores, "Siege", bold_top8=True)
-render_table(st.session_state.differentials, "Spiele")
+def sorted_ranking(statuses=None):
+    return logik.sorted_ranking(st.session_state, statuses)
+
+def render_table(data_dict, title, total_idx, statuses, bold_top8=False):
+    with metrics.timed(f"render_table.{title}"):
+        st.subheader(title)
+        ranking = sorted_ranking(statuses)
+        if not ranking:
+            st.caption("Noch keine Spieler.")
+            return
+        import pandas as pd
+        totals = st.session_state.totals
+        names = st.session_state.names
+        status = st.session_state.status
+        max_r = st.session_state.round
+        averaged = wertung.policy_of(st.session_state)["mittel"]
+        table = []
+        for i, p in enumerate(ranking):
+            row = {
+                "Spieler": f"{names[p]}  (✓)" if bold_top8 and i < 8 else names[p],
+                "Status": status[p],
+                "Spiele": totals[p][2]
+            }
+            for r in range(max_r):
+                row[f"R{r+1}"] = data_dict[p][r] if r < len(data_dict[p]) else 'X'
+            row["∑"] = totals[p][total_idx]
+            if averaged:
+                row["Ø"] = round(totals[p][total_idx] / max(totals[p][2], 1), 2)
+            table.append(row)
+
+        df = pd.DataFrame(table)
+        df.index = [i+1 for i in range(len(df))]  # Start index at 1
+        st.dataframe(df)
+
+def apply_scoring_choice():
+    wertung.rescore(st.session_state, st.session_state.scoring_choice)
+
+st.session_state.scoring_choice = st.session_state.scoring
+st.selectbox(
+    "Wertung", list(wertung.POLICIES), format_func=wertung.policy_name,
+    key="scoring_choice", on_change=apply_scoring_choice,
+    help="Beim Wechsel wird das ganze Turnier mit der neuen Wertung neu berechnet."
+)
+shown_statuses = st.multiselect(
+    "Status anzeigen", list(logik.STATUSES), default=[logik.ACTIVE, logik.PAUSED], key="standings_status"
+)
+render_table(st.session_state.scores, "Siege", 0, shown_statuses, bold_top8=True)
+render_table(st.session_state.differentials, "Spiele", 1, shown_statuses)
+rerun_timer.lap("standings")
 
 # Erweiterte Match-History anzeigen
 # st.markdown("---")
 # st.subheader("📜 History")
 with st.expander("📜 History", expanded=False):
-    for rnd, matches in st.session_state.history:
+    for rnd, round_log in enumerate(st.session_state.result_log, start=1):
         st.markdown(f"**Runde {rnd}:**")
-        for m in matches:
+        for m in logik.history_lines(st.session_state, rnd):
             st.markdown(f"- {m}")
         # Spielfrei anzeigen
         eingesetzte = set()
-        for m in matches:
-            names = m.split(":")[0].replace(" & ", ";").replace(" vs ", ";").split(";")
-            eingesetzte.update([n.strip() for n in names])
-        spielfrei = sorted(set(st.session_state.players) - eingesetzte)
+        for t1, t2, score1, score2 in round_log:
+            if score1 is not None:
+                eingesetzte.update(t1 + t2)
+        spielfrei = sorted_by_name(p for p in st.session_state.players if p not in eingesetzte)
         if spielfrei:
-            st.markdown(f"🛋️ **Spielfrei**: {', '.join(spielfrei)}")
+            st.markdown(f"🛋️ **Spielfrei**: {player_names(spielfrei)}")
+rerun_timer.lap("history")
+
+with st.expander("🛠️ Ergebnis korrigieren", expanded=False):
+    played_rounds = len(st.session_state.result_log)
+    if not played_rounds:
+        st.info("Noch keine Runde gespielt.")
+    else:
+        fix_round = st.selectbox("Runde", list(range(played_rounds, 0, -1)), key="fix_round")
+        round_log = st.session_state.result_log[fix_round - 1]
+        if round_log:
+            match_labels = [
+                f"Match {i+1}: {logik.format_match(st.session_state, t1, t2)} ({logik.format_result(score1, score2)})"
+                for i, (t1, t2, score1, score2) in enumerate(round_log)
+            ]
+            fix_match = st.selectbox(
+                "Match",
+                list(range(len(round_log))),
+                format_func=match_labels.__getitem__,
+                key="fix_match"
+            )
+            fix_result = st.text_input("Neues Ergebnis (leer = nicht gespielt)", key="fix_result")
+            fix_note = st.text_input("Notiz", key="fix_note")
+            if st.button("💾 Korrektur speichern"):
+                try:
+                    changed = logik.amend_result(
+                        st.session_state, fix_round, fix_match,
+                        ergebnis.parse_result(fix_result, st.session_state.format), fix_note
+                    )
+                except ValueError as e:
+                    st.error(f"Ungültiges Ergebnis: {e}")
+                else:
+                    if changed:
+                        st.success(f"Runde {fix_round}, Match {fix_match+1} korrigiert.")
+                    else:
+                        st.info("Ergebnis unverändert.")
+
+    if st.session_state.amendments:
+        st.markdown("**Korrekturprotokoll**")
+        for a in reversed(st.session_state.amendments):
+            notiz = f" – {a['notiz']}" if a['notiz'] else ""
+            paarung = logik.format_match(st.session_state, *a['teams'])
+            st.markdown(f"- {a['zeit']}: Runde {a['runde']}, Match {a['match']} ({paarung}): {a['alt']} → {a['neu']}{notiz}")
+rerun_timer.lap("amend")
 
 # V4
 # st.markdown("---")
@@ -400,7 +519,16 @@ with st.expander("💾 Session speichern / laden", expanded=False):
 
     with col1:
         if st.button("💾 Auf Server speichern"):
-            save_session_to_file()
+            st.session_state.save_conflict = not save_session_to_file()
+        if st.session_state.get("save_conflict"):
+            st.warning(
+                "⚠️ Die Session auf dem Server wurde inzwischen geändert "
+                "(z.B. Ergebnisse von den Tablets). Erst laden oder bewusst überschreiben."
+            )
+            if st.button("Trotzdem überschreiben", key="save_overwrite"):
+                save_session_to_file(force=True)
+                st.session_state.save_conflict = False
+                st.rerun()
 
     with col2:
         download_session_button()
@@ -411,38 +539,121 @@ with st.expander("💾 Session speichern / laden", expanded=False):
                     with open("session_backup.pkl", "rb") as f:
                         saved_state = pickle.load(f)
                     for key in saved_state:
-                        if (
-                            key.startswith("res_") or
-                            key.startswith("m") or
-                            key.startswith("FormSubmitter:") or
-                            key == "new_player_form_input"
-                        ):
+                        if is_widget_key(key):
                             continue
                         st.session_state[key] = saved_state[key]
+                    refresh_derived_state(saved_state)
+                    st.session_state.save_file_version = stored_version(saved_state)
+                    st.session_state.save_conflict = False
                     st.success("✅ Session erfolgreich geladen!")
                     
                     st.rerun()  # 👉 richtig für neue Streamlit-Version
                 except FileNotFoundError:
                     st.error("❌ Keine gespeicherte Session gefunden.")
+                except Exception as e:
+                    st.error(f"❌ Fehler beim Laden: {e}")
 
     with col4:
         uploaded_file = st.file_uploader("Session-Datei hochladen", type=["pkl"], label_visibility="collapsed")
         if uploaded_file is not None:
             load_session_from_upload(uploaded_file)
+rerun_timer.lap("session")
+
+
+with st.expander("📤 Export", expanded=False):
+    export_table = st.selectbox(
+        "Tabelle", list(export.TABLES), key="export_table",
+        format_func={"rangliste": "Rangliste", "runden": "Ergebnisse je Runde", "matches": "Matches"}.get
+    )
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        export_download_button(export_table, "csv", "⬇️ CSV", "text/csv")
+    with col2:
+        export_download_button(export_table, "parquet", "⬇️ Parquet", "application/vnd.apache.parquet")
+    with col3:
+        export_download_button("rangliste", "pdf", "🖨️ Rangliste (PDF)", "application/pdf")
+rerun_timer.lap("export")
+
+
+with st.expander("📅 Saison", expanded=False):
+    # Erst auf Wunsch: sonst öffnet jeder Seitenaufruf die Saison-DB und lädt pandas
+    if st.toggle("Saison anzeigen", key="season_show"):
+        season, season_lock = season_store()
+        col1, col2 = st.columns([3, 1])
+        event_name = col1.text_input("Turniername", value=time.strftime("Turnier %Y-%m-%d"), key="season_event")
+        replace_event = col2.checkbox("Ersetzen", key="season_replace")
+        if st.button("➕ Turnier zur Saison hinzufügen") and event_name.strip():
+            try:
+                with season_lock:
+                    saison.add_event(season, st.session_state, event_name.strip(), replace=replace_event)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            else:
+                st.success(f"✅ {event_name.strip()} übernommen")
+
+        with season_lock:
+            season_events = saison.events(season)
+            season_standings = saison.standings(season, limit=50) if season_events else []
+            season_pairs = saison.top_pairs(season, limit=10, min_games=2) if season_events else []
+        st.caption(f"{len(season_events)} Turniere in der Saison")
+        if season_events:
+            import pandas as pd
+            st.subheader("Saisonrangliste")
+            season_df = pd.DataFrame(
+                season_standings,
+                columns=["Spieler", "Turniere", "Spiele", "Schleifchen", "Differenz", "Turniersiege"]
+            )
+            season_df.index = [i+1 for i in range(len(season_df))]
+            st.dataframe(season_df)
+            st.subheader("Beste Paare")
+            st.dataframe(
+                pd.DataFrame(season_pairs, columns=["Spieler", "Partner", "Spiele", "Schleifchen"]),
+                hide_index=True
+            )
+rerun_timer.lap("season")
 
 
 # Halbfinale anzeigen
 st.markdown("---")
 st.header("🏆 Halbfinale")
 if st.button("Halbfinale anzeigen"):
-    top8 = sorted_ranking()[:8]
+    top8 = sorted_ranking((logik.ACTIVE, logik.PAUSED))[:8]
     if len(top8) < 8:
         st.warning("Nicht genug Spieler für das Halbfinale")
     else:
-        hf1 = f"Halbfinale 1: {top8[0]} & {top8[4]} vs {top8[3]} & {top8[7]}"
-        hf2 = f"Halbfinale 2: {top8[1]} & {top8[5]} vs {top8[2]} & {top8[6]}"
-        st.session_state.semifinals = (hf1, hf2)
+        hf1 = ([top8[0], top8[4]], [top8[3], top8[7]])
+        hf2 = ([top8[1], top8[5]], [top8[2], top8[6]])
+        st.session_state.semifinals = [hf1, hf2]
 
 if st.session_state.semifinals:
-    st.success(st.session_state.semifinals[0])
-    st.success(st.session_state.semifinals[1])
+    for i, (t1, t2) in enumerate(st.session_state.semifinals):
+        st.success(f"Halbfinale {i+1}: {logik.format_match(st.session_state, t1, t2)}")
+rerun_timer.lap("semifinals")
+
+
+# Laufzeiten (Admin)
+with st.expander("⏱️ Laufzeiten", expanded=False):
+    st.caption(f"Letzte {metrics.RING_SIZE} Messungen je Phase, prozessweit über alle Sessions.")
+    # Der Inhalt eines Expanders läuft bei jedem Durchlauf, auch zugeklappt –
+    # ausgewertet wird daher nur auf Wunsch
+    if st.toggle("Messwerte anzeigen", key="metrics_show"):
+        # Als Markdown-Tabelle, damit das Panel ohne pandas auskommt
+        timing_lines = [
+            "| Phase | Anzahl | p50 [ms] | p90 [ms] | p99 [ms] | Summe [s] |",
+            "|---|---:|---:|---:|---:|---:|",
+        ]
+        for name, count, total, values in metrics.REGISTRY.summary():
+            quantiles = " | ".join(f"{value * 1000:.2f}" for value in values.values())
+            timing_lines.append(f"| {name} | {count} | {quantiles} | {total:.3f} |")
+        st.markdown("\n".join(timing_lines))
+    col1, col2 = st.columns(2)
+    col1.download_button(
+        "⬇️ Prometheus", data=metrics.REGISTRY.prometheus_text,
+        file_name="schleifchenturnier.prom", mime="text/plain", key="metrics_prometheus"
+    )
+    if col2.button("🧹 Zurücksetzen", key="metrics_reset"):
+        metrics.REGISTRY.reset()
+
+rerun_timer.finish()
+if metrics.PROMETHEUS_FILE:
+    metrics.REGISTRY.write_prometheus(metrics.PROMETHEUS_FILE)
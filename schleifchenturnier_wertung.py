@@ -0,0 +1,138 @@
+"""Wertungsregeln: was ein Match (oder ein Freilos) in der Tabelle bringt.
+
+Eine Wertung ist ein Dict mit Parametern; ``POLICIES`` enthält die
+mitgelieferten, weitere lassen sich einfach ergänzen. Beim Eintragen einer
+Runde wird jede Zelle mit ``match_cell``/``bye_cell`` berechnet; beim
+Wechsel der Wertung rechnet ``rescore`` das ganze Turnier auf einmal als
+Matrix (Spieler × Runden) neu.
+
+    sieg / niederlage / unentschieden   Schleifchen je Ausgang
+    bonus, bonus_ab                     Zusatzpunkte ab diesem Vorsprung
+    differenz_max                       Differenz je Match gekappt (None = ohne)
+    freilos, freilos_differenz          Ausgleich bei Freilos (None = keine Wertung)
+    mittel                              Rangliste nach Schnitt pro Spiel statt Summe
+"""
+DEFAULT_POLICY = "schleifchen"
+
+_BASE = {
+    "sieg": 1, "niederlage": 0, "unentschieden": 0,
+    "bonus": 0, "bonus_ab": None, "differenz_max": None,
+    "freilos": None, "freilos_differenz": 0, "mittel": False,
+}
+
+POLICIES = {
+    "schleifchen": dict(_BASE, name="Schleifchen (Sieg 1, sonst 0)"),
+    "freilos": dict(_BASE, name="Freilos zählt als Sieg", freilos=1),
+    "remis": dict(_BASE, name="Unentschieden ½", unentschieden=0.5),
+    "gekappt": dict(_BASE, name="Differenz höchstens ±3 pro Match", differenz_max=3),
+    "bonus": dict(_BASE, name="Bonus ½ bei Sieg mit 3+ Spielen Vorsprung", bonus=0.5, bonus_ab=3),
+    "schnitt": dict(_BASE, name="Schnitt pro Spiel (für ungleiche Spielzahl)", mittel=True),
+}
+
+
+def policy_of(state):
+    return POLICIES[state['scoring']]
+
+
+def policy_name(key):
+    return POLICIES[key]["name"]
+
+
+def match_cell(policy, own, opp):
+    """``(differenz, schleifchen)`` für ein Team mit ``own`` zu ``opp``."""
+    margin = own - opp
+    if margin > 0:
+        point = policy["sieg"]
+        if policy["bonus_ab"] is not None and margin >= policy["bonus_ab"]:
+            point += policy["bonus"]
+    elif margin == 0:
+        point = policy["unentschieden"]
+    else:
+        point = policy["niederlage"]
+    cap = policy["differenz_max"]
+    if cap is not None:
+        margin = max(-cap, min(cap, margin))
+    return margin, point
+
+
+def bye_cell(policy):
+    if policy["freilos"] is None:
+        return 'X', 'X'
+    return policy["freilos_differenz"], policy["freilos"]
+
+
+def score_matrix(policy, own, opp, bye):
+    """Wertet die ganze Turniermatrix auf einmal aus.
+
+    ``own``/``opp`` sind Arrays (Spieler × Runden) mit den eigenen und
+    gegnerischen Spielen, NaN wo nicht gespielt; ``bye`` markiert Freilose.
+    Liefert ``(schleifchen, differenz)`` mit NaN für Zellen ohne Wertung.
+    """
+    import numpy as np
+
+    margin = own - opp
+    points = np.where(margin > 0, policy["sieg"], np.where(margin == 0, policy["unentschieden"], policy["niederlage"]))
+    points = points.astype(float)
+    if policy["bonus_ab"] is not None:
+        points += np.where(margin >= policy["bonus_ab"], policy["bonus"], 0)
+    diffs = margin if policy["differenz_max"] is None else np.clip(margin, -policy["differenz_max"], policy["differenz_max"])
+    played = ~np.isnan(own)
+    points[~played] = np.nan
+    diffs = np.where(played, diffs, np.nan)
+    if policy["freilos"] is not None:
+        points[bye] = policy["freilos"]
+        diffs[bye] = policy["freilos_differenz"]
+    return points, diffs
+
+
+def _cell_values(row):
+    return ['X' if v != v else (int(v) if v.is_integer() else v) for v in row.tolist()]
+
+
+def rescore(state, key=None):
+    """Rechnet Siege, Differenzen und Summen aller Spieler mit der Wertung neu."""
+    import numpy as np
+
+    if key is not None:
+        state['scoring'] = key
+    policy = policy_of(state)
+    n, rounds = len(state['names']), state['round']
+    own = np.full((n, rounds), np.nan)
+    opp = np.full((n, rounds), np.nan)
+    bye = np.zeros((n, rounds), dtype=bool)
+
+    rows, cols, own_games, opp_games = [], [], [], []
+    for rnd, round_log in enumerate(state['result_log']):
+        for t1, t2, score1, score2 in round_log:
+            if score1 is None:
+                continue
+            for team, a, b in ((t1, score1, score2), (t2, score2, score1)):
+                for pid in team:
+                    if pid >= 0:
+                        rows.append(pid)
+                        cols.append(rnd)
+                        own_games.append(a)
+                        opp_games.append(b)
+    own[rows, cols] = own_games
+    opp[rows, cols] = opp_games
+    for rnd, round_byes in enumerate(state['bye_log']):
+        bye[round_byes, rnd] = True
+    bye &= np.isnan(own)
+
+    points, diffs = score_matrix(policy, own, opp, bye)
+    games = (~np.isnan(own)).sum(axis=1)
+    point_sums = np.nansum(points, axis=1)
+    diff_sums = np.nansum(diffs, axis=1)
+
+    state['scores'] = [_cell_values(row) for row in points]
+    state['differentials'] = [_cell_values(row) for row in diffs]
+    state['totals'] = [
+        _cell_values(np.array([p, d])) + [int(g)] for p, d, g in zip(point_sums, diff_sums, games)
+    ]
+
+
+def ranking_key(policy, totals):
+    """Sortierschlüssel für die Rangliste (kleiner = besser)."""
+    if policy["mittel"]:
+        return lambda pid: (-totals[pid][0] / max(totals[pid][2], 1), -totals[pid][1] / max(totals[pid][2], 1))
+    return lambda pid: (-totals[pid][0], -totals[pid][1])